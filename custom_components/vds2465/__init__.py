@@ -1,25 +1,198 @@
 import asyncio
 import logging
 import datetime
+import re
+import time
+
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
 from homeassistant.const import CONF_PORT
-from homeassistant.helpers import device_registry as dr, entity_registry as er
-from .const import DOMAIN, CONF_DEVICES, EVENT_VDS_ALARM, EVENT_VDS_MONITORING, CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL
-from .vds_lib import VdSAsyncServer
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, device_registry as dr, entity_registry as er
+from homeassistant.helpers.storage import Store
+from .const import (
+    DOMAIN, CONF_DEVICES, EVENT_VDS_ALARM, EVENT_VDS_MONITORING, CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL,
+    CONF_RATE_LIMIT_DEVICE, CONF_RATE_LIMIT_ADDRESS, DEFAULT_RATE_LIMIT_DEVICE, DEFAULT_RATE_LIMIT_ADDRESS,
+    FLOOD_SUMMARY_INTERVAL, CONF_METRICS_PORT, DEFAULT_METRICS_PORT, CONF_METRICS_HOST, DEFAULT_METRICS_HOST, CONF_PERSIST_STATES, STORAGE_KEY_DISCOVERED,
+    STORAGE_KEY_ADDRESS_STATES,
+    CONF_LAZY_ENTITIES, CONF_IMPORTANT_ADDRESSES, CONF_WORKERS, DEFAULT_WORKERS,
+    CONF_OFFLOAD_THRESHOLD, DEFAULT_OFFLOAD_THRESHOLD, CONF_LISTENERS,
+    CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS, CONF_CONNECT_RATE, DEFAULT_CONNECT_RATE,
+    CONF_KEEPALIVE_IDLE, DEFAULT_KEEPALIVE_IDLE, CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL,
+    CONF_USER_TIMEOUT, DEFAULT_USER_TIMEOUT, CONF_IDLE_TIMEOUT, DEFAULT_IDLE_TIMEOUT,
+    CONF_RTO_MIN, DEFAULT_RTO_MIN_MS, CONF_RTO_MAX, DEFAULT_RTO_MAX_MS, OUTPUT_CONFIRM_TIMEOUT,
+    CONF_LINK_STATS_INTERVAL, DEFAULT_LINK_STATS_INTERVAL,
+    CONF_VDS_DEVICE, CONF_VDS_AREA
+)
+from .address_table import AddressStateTable, parse_address_list
+from .metrics import ReceiverMetrics, MetricsHttpServer, WindowedCounters
+from .outputs import PendingOutputs
+from .profiler import async_profile
+from .rate_limit import FloodGuard, SuppressedEvents
+from .vds_lib import VdSAsyncServer, intern_identnr, parse_listeners
+from .workers import ShardedVdSServer, reuse_port_supported
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["binary_sensor", "sensor", "switch"]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+ADDRESS_STATES_STORAGE_VERSION = 1
+# Alarm bursts touch many addresses; they are written in one go
+ADDRESS_STATES_SAVE_DELAY = 30
+
+# identnr-bound unique_id formats used by the platforms
+_UNIQUE_ID_RE = re.compile(
+    r"^vds_(?:"
+    r"(?:status|monitoring|last_msg|last_test_msg|manufacturer)_(?P<plain>.+)"
+    r"|output_(?P<switch>.+)_\d+"
+    r"|(?P<addr>.+)_(?:addr|output)_\d+"
+    r"|(?P<link>.+)_link_[a-z_]+"
+    r")$"
+)
+
+def ident_from_unique_id(unique_id):
+    """Extract the identnr from one of our unique_ids, None for unknown formats."""
+    match = _UNIQUE_ID_RE.match(unique_id)
+    if match is None:
+        return None
+    return match.group("plain") or match.group("switch") or match.group("addr") or match.group("link")
+
+SERVICE_PROFILE = "profile"
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional("seconds", default=30): vol.All(vol.Coerce(int), vol.Range(min=1, max=600)),
+})
+
+SERVICE_GET_ADDRESS_STATES = "get_address_states"
+GET_ADDRESS_STATES_SCHEMA = vol.Schema({
+    vol.Optional("identnr"): cv.string,
+    vol.Optional("adresse"): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+})
+
+SERVICE_ENABLE_ADDRESS = "enable_address"
+ENABLE_ADDRESS_SCHEMA = vol.Schema({
+    vol.Required("identnr"): cv.string,
+    vol.Required("adresse"): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+    vol.Optional("kind", default="addr"): vol.In(["addr", "out", "switch"]),
+})
+
+SERVICE_SET_OUTPUTS = "set_outputs"
+SET_OUTPUTS_SCHEMA = vol.Schema({
+    vol.Required("identnr"): cv.string,
+    vol.Required("outputs"): vol.All(cv.ensure_list, [vol.Schema({
+        vol.Required("adresse"): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+        vol.Required("zustand"): cv.boolean,
+    })]),
+    vol.Optional("geraet"): vol.All(vol.Coerce(int), vol.Range(min=0, max=15)),
+    vol.Optional("bereich"): vol.All(vol.Coerce(int), vol.Range(min=0, max=15)),
+})
+
+def _hub_for_ident(hass, identnr):
+    for hub in hass.data.get(DOMAIN, {}).values():
+        if any(str(dev.get("identnr")) == identnr for dev in hub.devices_config):
+            return hub
+    raise HomeAssistantError(f"Unknown VdS identnr {identnr}")
+
+async def async_setup(hass: HomeAssistant, config) -> bool:
+    """Register the integration-wide services."""
+
+    async def handle_profile(call: ServiceCall):
+        try:
+            servers = [hub.server for hub in hass.data.get(DOMAIN, {}).values()]
+            return await async_profile(hass, call.data["seconds"], servers)
+        except RuntimeError as e:
+            raise HomeAssistantError(str(e)) from e
+
+    async def handle_get_address_states(call: ServiceCall):
+        states = []
+        for hub in hass.data.get(DOMAIN, {}).values():
+            states.extend(hub.address_table.query(call.data.get("identnr"), call.data.get("adresse")))
+        return {"states": states}
+
+    async def handle_enable_address(call: ServiceCall):
+        identnr = call.data["identnr"]
+        hub = _hub_for_ident(hass, identnr)
+        if not hub.materialize(identnr, call.data["adresse"], call.data["kind"]):
+            raise HomeAssistantError(f"No platform available for {call.data['kind']} entities")
+
+    async def handle_set_outputs(call: ServiceCall):
+        identnr = call.data["identnr"]
+        hub = _hub_for_ident(hass, identnr)
+        dev_conf = next(dev for dev in hub.devices_config if str(dev.get("identnr")) == identnr)
+        device = call.data.get("geraet", dev_conf.get(CONF_VDS_DEVICE, 1))
+        area = call.data.get("bereich", dev_conf.get(CONF_VDS_AREA, 1))
+        # All commands are issued before the first await, so they go out as one batch
+        outputs = call.data["outputs"]
+        futures = [hub.send_output(identnr, out["adresse"], out["zustand"], device, area) for out in outputs]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+        report = []
+        for out, result in zip(outputs, results):
+            failed = isinstance(result, Exception)
+            report.append({
+                "adresse": out["adresse"],
+                "zustand": out["zustand"],
+                "confirmed": not failed and result == out["zustand"],
+                "reported": None if failed else result,
+                "error": str(result) if failed else None,
+            })
+        if call.return_response:
+            return {"outputs": report}
+        failed = [entry["adresse"] for entry in report if not entry["confirmed"]]
+        if failed:
+            raise HomeAssistantError(f"VdS device {identnr} did not confirm outputs {failed}")
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, handle_profile, schema=PROFILE_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_GET_ADDRESS_STATES, handle_get_address_states,
+        schema=GET_ADDRESS_STATES_SCHEMA, supports_response=SupportsResponse.ONLY
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_ENABLE_ADDRESS, handle_enable_address, schema=ENABLE_ADDRESS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_OUTPUTS, handle_set_outputs,
+        schema=SET_OUTPUTS_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+    return True
+
+def global_settings(entry: ConfigEntry) -> dict:
+    """Settings that require a full reload of the entry when changed."""
+    # Port and Interval can be in data (initial) or options (updates)
+    return {
+        CONF_PORT: entry.options.get(CONF_PORT, entry.data.get(CONF_PORT)),
+        CONF_POLLING_INTERVAL: entry.options.get(CONF_POLLING_INTERVAL, entry.data.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL)),
+        CONF_PERSIST_STATES: entry.options.get(CONF_PERSIST_STATES, entry.data.get(CONF_PERSIST_STATES, True)),
+        CONF_RATE_LIMIT_DEVICE: entry.options.get(CONF_RATE_LIMIT_DEVICE, DEFAULT_RATE_LIMIT_DEVICE),
+        CONF_RATE_LIMIT_ADDRESS: entry.options.get(CONF_RATE_LIMIT_ADDRESS, DEFAULT_RATE_LIMIT_ADDRESS),
+        CONF_METRICS_PORT: entry.options.get(CONF_METRICS_PORT, DEFAULT_METRICS_PORT),
+        CONF_METRICS_HOST: entry.options.get(CONF_METRICS_HOST, DEFAULT_METRICS_HOST),
+        CONF_LAZY_ENTITIES: entry.options.get(CONF_LAZY_ENTITIES, False),
+        CONF_WORKERS: entry.options.get(CONF_WORKERS, DEFAULT_WORKERS),
+        CONF_OFFLOAD_THRESHOLD: entry.options.get(CONF_OFFLOAD_THRESHOLD, DEFAULT_OFFLOAD_THRESHOLD),
+        CONF_LISTENERS: entry.options.get(CONF_LISTENERS, ""),
+        CONF_MAX_CONNECTIONS: entry.options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS),
+        CONF_CONNECT_RATE: entry.options.get(CONF_CONNECT_RATE, DEFAULT_CONNECT_RATE),
+        CONF_KEEPALIVE_IDLE: entry.options.get(CONF_KEEPALIVE_IDLE, DEFAULT_KEEPALIVE_IDLE),
+        CONF_KEEPALIVE_INTERVAL: entry.options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL),
+        CONF_USER_TIMEOUT: entry.options.get(CONF_USER_TIMEOUT, DEFAULT_USER_TIMEOUT),
+        CONF_IDLE_TIMEOUT: entry.options.get(CONF_IDLE_TIMEOUT, DEFAULT_IDLE_TIMEOUT),
+        CONF_RTO_MIN: entry.options.get(CONF_RTO_MIN, DEFAULT_RTO_MIN_MS),
+        CONF_RTO_MAX: entry.options.get(CONF_RTO_MAX, DEFAULT_RTO_MAX_MS),
+        CONF_LINK_STATS_INTERVAL: entry.options.get(CONF_LINK_STATS_INTERVAL, DEFAULT_LINK_STATS_INTERVAL),
+    }
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up VdS 2465 from a config entry."""
     hass.data.setdefault(DOMAIN, {})
+    setup_start = time.monotonic()
 
-    # Port and Interval can be in data (initial) or options (updates)
-    port = entry.options.get(CONF_PORT, entry.data.get(CONF_PORT))
-    interval = entry.options.get(CONF_POLLING_INTERVAL, entry.data.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL))
+    settings = global_settings(entry)
     
     devices_raw = entry.options.get(CONF_DEVICES, {})
     current_ident_nrs = {str(d["identnr"]) for d in devices_raw.values()}
@@ -30,7 +203,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     
     for dev_entry in device_entries:
         for domain, ident in dev_entry.identifiers:
-            if domain == DOMAIN and ident not in current_ident_nrs:
+            if domain == DOMAIN and ident not in current_ident_nrs and not ident.startswith("receiver_"):
                 _LOGGER.info(f"Removing orphaned VdS device from registry: {ident}")
                 device_registry.async_remove_device(dev_entry.id)
                 break
@@ -40,8 +213,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     entity_entries = er.async_entries_for_config_entry(entity_registry, entry.entry_id)
     for ent_entry in entity_entries:
         # Check if the entity is associated with an identnr that no longer exists
-        # We look for the identnr in the unique_id (common pattern in this component) 
-        # OR we check if its device is gone.
+        # We parse the identnr from the unique_id OR we check if its device is gone.
         
         # Check if device_id is still in the device registry (if it had one)
         if ent_entry.device_id:
@@ -50,19 +222,41 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 entity_registry.async_remove_entry(ent_entry.entity_id)
                 continue
 
+        # Receiver-wide diagnostic sensors are not bound to an identnr
+        if ent_entry.unique_id.startswith("vds_receiver_"):
+            continue
+
         # Check unique_id for identnr (failsafe)
-        # Unique IDs are usually vds_[ident]_... or similar
-        for ident in current_ident_nrs:
-            if ident in ent_entry.unique_id:
-                break
-        else:
-            # No current identnr found in unique_id, and it belongs to our entry
+        if ident_from_unique_id(ent_entry.unique_id) not in current_ident_nrs:
+            # No current identnr in unique_id, and it belongs to our entry
             _LOGGER.info(f"Removing orphaned VdS entity (no config): {ent_entry.entity_id}")
             entity_registry.async_remove_entry(ent_entry.entity_id)
+    cleanup_time = time.monotonic() - setup_start
     
     devices_config_list = list(devices_raw.values())
 
-    hub = VdsHub(hass, port, interval, devices_config_list)
+    hub = VdsHub(
+        hass, settings[CONF_PORT], settings[CONF_POLLING_INTERVAL], devices_config_list,
+        settings[CONF_RATE_LIMIT_DEVICE], settings[CONF_RATE_LIMIT_ADDRESS], settings[CONF_METRICS_PORT],
+        settings[CONF_WORKERS], settings[CONF_LISTENERS], settings[CONF_METRICS_HOST],
+        offload_threshold=settings[CONF_OFFLOAD_THRESHOLD],
+        max_connections=settings[CONF_MAX_CONNECTIONS],
+        connect_rate=settings[CONF_CONNECT_RATE],
+        keepalive_idle=settings[CONF_KEEPALIVE_IDLE],
+        keepalive_interval=settings[CONF_KEEPALIVE_INTERVAL],
+        user_timeout=settings[CONF_USER_TIMEOUT],
+        idle_timeout=settings[CONF_IDLE_TIMEOUT],
+        # The only conversion: options are in milliseconds, the server works in seconds
+        rto_min=settings[CONF_RTO_MIN] / 1000,
+        rto_max=settings[CONF_RTO_MAX] / 1000,
+        link_stats_interval=settings[CONF_LINK_STATS_INTERVAL],
+    )
+    hub.settings = settings
+    hub.lazy = settings[CONF_LAZY_ENTITIES]
+    hub.address_store = Store(
+        hass, ADDRESS_STATES_STORAGE_VERSION, STORAGE_KEY_ADDRESS_STATES.format(entry_id=entry.entry_id)
+    )
+    await hub.async_load_address_states()
     
     # Start Server Task
     try:
@@ -76,6 +270,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     entry.async_on_unload(entry.add_update_listener(update_listener))
 
+    _LOGGER.info(
+        f"VdS setup finished in {time.monotonic() - setup_start:.3f}s "
+        f"(registry cleanup {cleanup_time:.3f}s for {len(entity_entries)} entities)"
+    )
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -98,41 +296,162 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     return unload_ok
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the stored discovered sensors and address states of a removed entry."""
+    await Store(hass, 1, STORAGE_KEY_DISCOVERED.format(entry_id=entry.entry_id)).async_remove()
+    await Store(
+        hass, ADDRESS_STATES_STORAGE_VERSION, STORAGE_KEY_ADDRESS_STATES.format(entry_id=entry.entry_id)
+    ).async_remove()
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
-    """Handle options update."""
+    """Handle options update.
+
+    Device changes are applied to the running hub; only global settings
+    (port, interval, ...) need a full reload.
+    """
+    hub = hass.data[DOMAIN].get(entry.entry_id)
+    if hub is not None and hub.settings == global_settings(entry):
+        await hub.async_update_devices(list(entry.options.get(CONF_DEVICES, {}).values()))
+        return
     await hass.config_entries.async_reload(entry.entry_id)
 
 
 class VdsHub:
-    """Hub to handle VdS Server and entity callbacks."""
-    def __init__(self, hass, port, interval, devices_config):
+    """Hub to handle VdS Server and entity callbacks.
+
+    Extra keyword arguments (offload_threshold, max_connections, ...) are
+    passed on to the VdS server.
+    """
+    def __init__(self, hass, port, interval, devices_config,
+                 device_rate=DEFAULT_RATE_LIMIT_DEVICE, address_rate=DEFAULT_RATE_LIMIT_ADDRESS,
+                 metrics_port=DEFAULT_METRICS_PORT, workers=DEFAULT_WORKERS, listeners="",
+                 metrics_host=DEFAULT_METRICS_HOST, **server_options):
         self.hass = hass
         self.port = port
         self.interval = interval
-        self.devices_config = devices_config
-        self.server = VdSAsyncServer("0.0.0.0", port, devices_config, self.handle_vds_event, interval)
+        self.settings = {}
+        # Own copies, so edits in the options flow show up as a diff
+        self.devices_config = [dict(dev) for dev in devices_config]
+        self.metrics = ReceiverMetrics()
+        try:
+            self.listeners = parse_listeners(listeners, port)
+        except ValueError as e:
+            _LOGGER.error(f"Invalid VdS listeners '{listeners}' ({e}), listening on port {port} only")
+            self.listeners = parse_listeners("", port)
+        if workers and not reuse_port_supported():
+            _LOGGER.warning("SO_REUSEPORT is not available on this platform, running VdS receiver in-process")
+            workers = 0
+        if workers:
+            self.server = ShardedVdSServer(
+                "0.0.0.0", port, self.devices_config, self.handle_vds_event, interval, self.metrics, workers,
+                listeners=self.listeners, **server_options
+            )
+        else:
+            self.server = VdSAsyncServer(
+                "0.0.0.0", port, self.devices_config, self.handle_vds_event, interval, self.metrics,
+                listeners=self.listeners, **server_options
+            )
+        self.metrics_server = None
+        if metrics_port:
+            self.metrics_server = MetricsHttpServer(metrics_host or DEFAULT_METRICS_HOST, metrics_port, self.metrics.render)
         self._listeners = []
+        # platform -> callback(old_conf, new_conf) for runtime device changes
+        self._device_handlers = {}
+
+        # Lazy mode: only important/enabled addresses get entities, all are kept in the table
+        self.lazy = False
+        self.address_table = AddressStateTable()
+        # Store for the table, so get_address_states still answers after a restart
+        self.address_store = None
+        self._important = {}
+        # kind ("addr", "out", "switch") -> callback(identnr, adresse)
+        self._materializers = {}
         
         # Monitoring
         self.monitor_task = None
         self.last_test_msg = {}
         self.overdue_state = {}
+        # identnr -> WindowedCounters from the connections' periodic link_stats reports
+        self.link_stats = {}
+
+        # Output commands: collected per identnr until the end of the loop iteration,
+        # then sent as one batch and tracked until the device reports the new state
+        self._output_batches = {}
+        self.pending_outputs = PendingOutputs(hass.loop, OUTPUT_CONFIRM_TIMEOUT)
+
+        # Flood control for alarm events (protocol acks are not affected)
+        self.flood_task = None
+        self._device_guard = FloodGuard(device_rate)
+        self._address_guard = FloodGuard(address_rate)
+        self._suppressed = SuppressedEvents()
         
         # Initialize last_test_msg to now for all configured devices with interval
-        now = datetime.datetime.now()
-        for dev in devices_config:
-            ident = str(dev.get("identnr"))
-            if dev.get("test_interval", 0) > 0:
-                self.last_test_msg[ident] = now
-                self.overdue_state[ident] = False
+        for dev in self.devices_config:
+            self._init_monitoring(dev)
+        self._build_important()
+
+    def _build_important(self):
+        self._important = {}
+        for dev in self.devices_config:
+            try:
+                self._important[intern_identnr(dev.get("identnr"))] = parse_address_list(dev.get(CONF_IMPORTANT_ADDRESSES, ""))
+            except ValueError:
+                _LOGGER.warning(f"Invalid important addresses for VdS device {dev.get('identnr')}")
+
+    def is_important(self, identnr, adresse):
+        """True if an address always gets an entity, even in lazy mode."""
+        return int(adresse) in self._important.get(str(identnr), ())
+
+    def register_materializer(self, kind, callback_func):
+        self._materializers[kind] = callback_func
+        return lambda: self._materializers.pop(kind, None)
+
+    def materialize(self, identnr, adresse, kind):
+        """Create the entity for an address on request (lazy mode)."""
+        materializer = self._materializers.get(kind)
+        if materializer is None:
+            return False
+        materializer(str(identnr), int(adresse))
+        return True
+
+    def _init_monitoring(self, dev):
+        ident = intern_identnr(dev.get("identnr"))
+        if dev.get("test_interval", 0) > 0:
+            self.last_test_msg.setdefault(ident, datetime.datetime.now())
+            self.overdue_state.setdefault(ident, False)
+
+    async def async_load_address_states(self):
+        """Restore the address table saved before the last restart."""
+        data = await self.address_store.async_load()
+        if data is not None:
+            self.address_table.load(data.get("states", []))
+            _LOGGER.debug(f"Restored {len(self.address_table)} VdS address states")
+
+    def _schedule_address_save(self):
+        if self.address_store is not None:
+            self.address_store.async_delay_save(
+                lambda: {"states": self.address_table.dump()}, ADDRESS_STATES_SAVE_DELAY
+            )
 
     async def start(self):
         await self.server.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                _LOGGER.error(f"Failed to start VdS metrics endpoint: {e}")
+                self.metrics_server = None
         self.monitor_task = asyncio.create_task(self.monitor_loop())
+        self.flood_task = asyncio.create_task(self.flood_summary_loop())
 
     async def stop(self):
         if self.monitor_task:
             self.monitor_task.cancel()
+        if self.flood_task:
+            self.flood_task.cancel()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        self.pending_outputs.cancel_all()
         await self.server.stop()
 
     async def monitor_loop(self):
@@ -144,7 +463,7 @@ class VdsHub:
                 now = datetime.datetime.now()
                 
                 for dev in self.devices_config:
-                    ident = str(dev.get("identnr"))
+                    ident = intern_identnr(dev.get("identnr"))
                     interval_min = dev.get("test_interval", 0)
                     
                     if interval_min <= 0:
@@ -192,10 +511,72 @@ class VdsHub:
             except Exception as e:
                 _LOGGER.error(f"Error in VdS monitoring loop: {e}")
 
+    async def flood_summary_loop(self):
+        """Periodically summarize alarm events dropped by the rate limiter."""
+        while True:
+            try:
+                await asyncio.sleep(FLOOD_SUMMARY_INTERVAL)
+                self.flush_suppressed()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                _LOGGER.error(f"Error in VdS flood summary loop: {e}")
+
+    def flush_suppressed(self):
+        """Report suppressed alarm events and dispatch the latest one per address."""
+        for (ident, adresse), count, seconds, event_type, data in self._suppressed.pop_all():
+            text = f"address {adresse} toggled {count} times in {seconds} s"
+            _LOGGER.warning(f"VdS Device {ident}: rate limit hit, {text}")
+            self.hass.bus.async_fire(EVENT_VDS_MONITORING, {
+                "type": "flood",
+                "identnr": ident,
+                "adresse": adresse,
+                "suppressed": count,
+                "seconds": seconds,
+                "text": text
+            })
+            # The last suppressed state wins so entities end up consistent
+            self._dispatch(event_type, {**data, "suppressed": count})
+
+    def _admit(self, ident, data):
+        """Token-bucket check per address and per identnr.
+
+        Both buckets are checked before either is charged, so an event dropped
+        by the device limit does not use up its address's budget.
+        """
+        now = time.monotonic()
+        address = (ident, data.get("adresse"))
+        if not (self._address_guard.check(address, now) and self._device_guard.check(ident, now)):
+            return False
+        self._address_guard.admit(address, now)
+        self._device_guard.admit(ident, now)
+        return True
+
     def handle_vds_event(self, event_type, data):
         """Callback from VdS Lib."""
+        # identnr strings may come unpickled from a worker; swap in the interned copy
+        # so entity comparisons hit the identity fast path
+        if data.get("identnr") is not None:
+            data["identnr"] = intern_identnr(data["identnr"])
         # Update monitoring stats
         ident = str(data.get("identnr"))
+
+        if event_type == "link_stats":
+            self._update_link_stats(ident, data)
+            return
+        if event_type == "disconnected" and ident in self.link_stats:
+            self.link_stats[ident].queue_depth = 0
+
+        # Feedback for pending output commands, before flood control can drop it
+        if event_type == "alarm" and data.get("quelle") == "Ausgang" and data.get("adresse") is not None:
+            self.pending_outputs.confirm(ident, int(data["adresse"]), data.get("zustand") == "Ein")
+        elif event_type == "error":
+            self.pending_outputs.fail(ident, f"VdS device {ident} reported error {data.get('code')}: {data.get('text')}")
+        elif event_type == "disconnected":
+            # Commands still parked in the offline queue wait for the next connection
+            self.pending_outputs.fail(ident, f"VdS device {ident} disconnected", keep_parked=True)
+        elif event_type == "connected":
+            self.pending_outputs.delivered(ident)
         
         # Check for Test Message to update timestamp
         if event_type == "status" and data.get("msg") == "Testmeldung":
@@ -222,6 +603,34 @@ class VdsHub:
                     "type": "Meldung"
                 })
 
+        if event_type == "alarm" and not self._admit(ident, data):
+            self._suppressed.add((ident, data.get("adresse")), event_type, data)
+            self.metrics.inc("suppressed_events")
+            return
+
+        self._dispatch(event_type, data)
+
+    def _update_link_stats(self, ident, data):
+        """Add one link_stats report to the device window and notify the link sensors.
+
+        Reports arrive every few seconds per device, so they are kept off the HA bus.
+        """
+        now = time.monotonic()
+        window = self.link_stats.get(ident)
+        if window is None:
+            window = self.link_stats[ident] = WindowedCounters(now)
+        window.add(now, data)
+        window.queue_depth = data.get("queue_depth", 0)
+        window.rtt_quantiles = {key: value for key, value in data.items() if key.startswith("rtt_p")}
+        for listener in self._listeners:
+            listener("link_stats", data)
+
+    def _dispatch(self, event_type, data):
+        """Fire the event on the HA bus and notify entities."""
+        if event_type == "alarm":
+            self.address_table.update(data)
+            self._schedule_address_save()
+
         # 1. Fire generic event to HA Bus
         event_payload = {"type": event_type, **data}
         _LOGGER.debug(f"VdS Event: {event_type} - {data}")
@@ -231,14 +640,104 @@ class VdsHub:
         for listener in self._listeners:
             listener(event_type, data)
 
+    def register_device_handler(self, platform, callback_func):
+        """Let a platform add/remove its entities when devices change at runtime."""
+        self._device_handlers[platform] = callback_func
+        return lambda: self._device_handlers.pop(platform, None)
+
+    def remove_entities(self, platform, unique_ids):
+        """Remove entities of this integration by unique_id from the entity registry."""
+        entity_registry = er.async_get(self.hass)
+        for unique_id in unique_ids:
+            entity_id = entity_registry.async_get_entity_id(platform, DOMAIN, unique_id)
+            if entity_id:
+                entity_registry.async_remove(entity_id)
+
+    async def async_update_devices(self, devices_config):
+        """Apply a changed device list without restarting the server."""
+        old = {str(dev.get("identnr")): dev for dev in self.devices_config}
+        new_list = [dict(dev) for dev in devices_config]
+        new = {str(dev.get("identnr")): dev for dev in new_list}
+
+        added = [ident for ident in new if ident not in old]
+        removed = [ident for ident in old if ident not in new]
+        changed = [ident for ident in new if ident in old and new[ident] != old[ident]]
+        if not (added or removed or changed):
+            return
+
+        _LOGGER.info(f"Updating VdS devices: added={added}, removed={removed}, changed={changed}")
+        self.devices_config = new_list
+        self._build_important()
+        closed = await self.server.update_devices(new_list)
+        if closed:
+            _LOGGER.debug(f"Closed {closed} VdS connections with changed credentials")
+
+        for ident in removed:
+            self.last_test_msg.pop(ident, None)
+            self.overdue_state.pop(ident, None)
+            self.address_table.forget(ident)
+            self.link_stats.pop(ident, None)
+        if removed:
+            self._schedule_address_save()
+        for ident in added + changed:
+            if new[ident].get("test_interval", 0) > 0:
+                self._init_monitoring(new[ident])
+            else:
+                self.last_test_msg.pop(ident, None)
+                self.overdue_state.pop(ident, None)
+
+        # Removing the device also removes all of its entities
+        device_registry = dr.async_get(self.hass)
+        for ident in removed:
+            dev_entry = device_registry.async_get_device(identifiers={(DOMAIN, ident)})
+            if dev_entry:
+                device_registry.async_remove_device(dev_entry.id)
+
+        for handler in list(self._device_handlers.values()):
+            for ident in added:
+                handler(None, new[ident])
+            for ident in changed:
+                handler(old[ident], new[ident])
+            for ident in removed:
+                handler(old[ident], None)
+
     def add_listener(self, callback_func):
         self._listeners.append(callback_func)
         return lambda: self._listeners.remove(callback_func)
 
     def send_output(self, identnr, address, state, device=1, area=1):
-        """Send output command to a specific device."""
-        if not self.server.send_output_command(identnr, address, state, device, area):
-            _LOGGER.warning(f"Could not send output command to {identnr}: Device not connected")
+        """Send an output command to a specific device.
+
+        Returns a future with the state the device reports back. Commands to one
+        device issued in the same loop iteration are sent together in one frame.
+        """
+        ident = intern_identnr(identnr)
+        future = self.hass.loop.create_future()
+        batch = self._output_batches.get(ident)
+        if batch is None:
+            batch = self._output_batches[ident] = []
+            self.hass.loop.call_soon(self._flush_outputs, ident)
+        batch.append((int(address), bool(state), device, area, future))
+        return future
+
+    @callback
+    def _flush_outputs(self, ident):
+        batch = self._output_batches.pop(ident, [])
+        # A later command for the same address replaces the earlier one
+        commands = {address: (address, state, device, area) for address, state, device, area, _ in batch}
+        # Commands for a disconnected device wait in the server's queue first
+        timeout = None
+        parked = not self.server.is_connected(ident)
+        if parked:
+            timeout = self.server.pending_outputs.ttl + OUTPUT_CONFIRM_TIMEOUT
+        if not self.server.send_output_commands(ident, list(commands.values())):
+            _LOGGER.warning(f"Could not send output command to {ident}: Unknown device")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(HomeAssistantError(f"VdS device {ident} is not configured"))
+            return
+        for address, *_, future in batch:
+            self.pending_outputs.add(ident, address, future, timeout, parked)
 
     def is_connected(self, identnr):
         """Check if a device is currently connected."""
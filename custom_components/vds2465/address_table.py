@@ -0,0 +1,80 @@
+import datetime
+import time
+
+
+def parse_address_list(value):
+    """Parse "1, 4, 10-12" into a set of addresses. Raises ValueError on bad input."""
+    addresses = set()
+    for part in str(value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = (int(p) for p in part.split("-", 1))
+            if start > end:
+                raise ValueError(f"Invalid range {part}")
+            addresses.update(range(start, end + 1))
+        else:
+            addresses.add(int(part))
+    if any(a < 0 or a > 255 for a in addresses):
+        raise ValueError("Addresses must be between 0 and 255")
+    return addresses
+
+
+class AddressStateTable:
+    """Last state of every address seen, kept as plain tuples.
+
+    Used in lazy mode, where most addresses have no entity of their own.
+    """
+
+    def __init__(self):
+        # identnr -> {(adresse, kind): (text, code, zustand, timestamp)}
+        self._states = {}
+
+    def update(self, data):
+        adresse = data.get("adresse")
+        if adresse is None:
+            return
+        kind = "out" if data.get("quelle") == "Ausgang" else "addr"
+        self._states.setdefault(str(data.get("identnr")), {})[(int(adresse), kind)] = (
+            data.get("text"), data.get("code"), data.get("zustand"), time.time()
+        )
+
+    def forget(self, identnr):
+        self._states.pop(str(identnr), None)
+
+    def dump(self):
+        """Return the table as JSON-serialisable rows for storage."""
+        return [
+            [ident, addr, kind, text, code, zustand, ts]
+            for ident, states in self._states.items()
+            for (addr, kind), (text, code, zustand, ts) in states.items()
+        ]
+
+    def load(self, rows):
+        """Merge rows written by dump(); states seen since startup win."""
+        for ident, addr, kind, text, code, zustand, ts in rows:
+            self._states.setdefault(str(ident), {}).setdefault((int(addr), kind), (text, code, zustand, ts))
+
+    def query(self, identnr=None, adresse=None):
+        """Return the stored states as dicts, optionally filtered."""
+        result = []
+        for ident, states in self._states.items():
+            if identnr is not None and ident != str(identnr):
+                continue
+            for (addr, kind), (text, code, zustand, ts) in sorted(states.items()):
+                if adresse is not None and addr != adresse:
+                    continue
+                result.append({
+                    "identnr": ident,
+                    "adresse": addr,
+                    "kind": kind,
+                    "text": text,
+                    "code": code,
+                    "zustand": zustand,
+                    "last_changed": datetime.datetime.fromtimestamp(ts).isoformat(),
+                })
+        return result
+
+    def __len__(self):
+        return sum(len(states) for states in self._states.values())
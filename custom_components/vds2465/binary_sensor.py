@@ -4,6 +4,7 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.entity import EntityCategory
 from .const import DOMAIN, CONF_DEVICES
+from .vds_lib import intern_identnr
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -24,6 +25,27 @@ async def async_setup_entry(
 
     async_add_entities(entities)
 
+    @callback
+    def device_changed(old_conf, new_conf):
+        """Add or remove entities for a device added/edited at runtime."""
+        if new_conf is None:
+            return # Device registry removal takes care of the entities
+        if old_conf is None:
+            new_entities = [VdsConnectivitySensor(hub, new_conf)]
+            if new_conf.get("test_interval", 0) > 0:
+                new_entities.append(VdsMonitoringSensor(hub, new_conf))
+            async_add_entities(new_entities)
+            return
+
+        was_monitored = old_conf.get("test_interval", 0) > 0
+        is_monitored = new_conf.get("test_interval", 0) > 0
+        if is_monitored and not was_monitored:
+            async_add_entities([VdsMonitoringSensor(hub, new_conf)])
+        elif was_monitored and not is_monitored:
+            hub.remove_entities("binary_sensor", [f"vds_monitoring_{new_conf.get('identnr')}"])
+
+    entry.async_on_unload(hub.register_device_handler("binary_sensor", device_changed))
+
 
 class VdsConnectivitySensor(BinarySensorEntity):
     """Binary Sensor representing connection status of a VdS device."""
@@ -35,7 +57,7 @@ class VdsConnectivitySensor(BinarySensorEntity):
 
     def __init__(self, hub, dev_conf):
         self._hub = hub
-        self._ident_nr = str(dev_conf.get("identnr", "Unknown"))
+        self._ident_nr = intern_identnr(dev_conf.get("identnr", "Unknown"))
         # Unique ID based on IdentNr to support multiple unencrypted devices
         self._attr_unique_id = f"vds_status_{self._ident_nr}"
         self._attr_translation_key = "connectivity"
@@ -59,7 +81,7 @@ class VdsConnectivitySensor(BinarySensorEntity):
     def _handle_event(self, event_type, data):
         """Handle events from VdS Hub."""
         # Match by IdentNr
-        if str(data.get("identnr")) != self._ident_nr:
+        if data.get("identnr") != self._ident_nr:
             return
 
         if event_type == "connected":
@@ -80,7 +102,7 @@ class VdsMonitoringSensor(BinarySensorEntity):
 
     def __init__(self, hub, dev_conf):
         self._hub = hub
-        self._ident_nr = str(dev_conf.get("identnr", "Unknown"))
+        self._ident_nr = intern_identnr(dev_conf.get("identnr", "Unknown"))
         self._attr_unique_id = f"vds_monitoring_{self._ident_nr}"
         self._attr_translation_key = "monitoring"
         self._attr_is_on = False # False = No Problem
@@ -102,7 +124,7 @@ class VdsMonitoringSensor(BinarySensorEntity):
     @callback
     def _handle_event(self, event_type, data):
         """Handle events from VdS Hub."""
-        if str(data.get("identnr")) != self._ident_nr:
+        if data.get("identnr") != self._ident_nr:
             return
 
         if event_type == "alarm":
@@ -17,8 +17,45 @@ from .const import (
     CONF_TEST_INTERVAL,
     CONF_POLLING_INTERVAL, 
     DEFAULT_POLLING_INTERVAL,
-    CONF_PERSIST_STATES
+    CONF_PERSIST_STATES,
+    CONF_RATE_LIMIT_DEVICE,
+    CONF_RATE_LIMIT_ADDRESS,
+    DEFAULT_RATE_LIMIT_DEVICE,
+    DEFAULT_RATE_LIMIT_ADDRESS,
+    CONF_METRICS_PORT,
+    DEFAULT_METRICS_PORT,
+    CONF_METRICS_HOST,
+    DEFAULT_METRICS_HOST,
+    CONF_LAZY_ENTITIES,
+    CONF_IMPORTANT_ADDRESSES,
+    CONF_WORKERS,
+    DEFAULT_WORKERS,
+    MAX_WORKERS,
+    CONF_OFFLOAD_THRESHOLD,
+    DEFAULT_OFFLOAD_THRESHOLD,
+    CONF_LISTENERS,
+    CONF_MAX_CONNECTIONS,
+    DEFAULT_MAX_CONNECTIONS,
+    CONF_CONNECT_RATE,
+    DEFAULT_CONNECT_RATE,
+    CONF_ALLOWED_IPS,
+    CONF_KEEPALIVE_IDLE,
+    DEFAULT_KEEPALIVE_IDLE,
+    CONF_KEEPALIVE_INTERVAL,
+    DEFAULT_KEEPALIVE_INTERVAL,
+    CONF_USER_TIMEOUT,
+    DEFAULT_USER_TIMEOUT,
+    CONF_IDLE_TIMEOUT,
+    DEFAULT_IDLE_TIMEOUT,
+    CONF_RTO_MIN,
+    DEFAULT_RTO_MIN_MS,
+    CONF_RTO_MAX,
+    DEFAULT_RTO_MAX_MS,
+    CONF_LINK_STATS_INTERVAL,
+    DEFAULT_LINK_STATS_INTERVAL
 )
+from .address_table import parse_address_list
+from .vds_lib import parse_listeners, parse_networks
 
 class VdSConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
@@ -58,10 +95,18 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_global_settings(self, user_input=None):
         """Step to configure global settings."""
+        errors = {}
         if user_input is not None:
-            new_options = self.config_entry_local.options.copy()
-            new_options.update(user_input)
-            return self.async_create_entry(title="", data=new_options)
+            try:
+                parse_listeners(user_input.get(CONF_LISTENERS, ""), user_input[CONF_PORT])
+            except ValueError:
+                errors["base"] = "listeners_invalid"
+            if user_input[CONF_RTO_MIN] > user_input[CONF_RTO_MAX]:
+                errors["base"] = "rto_invalid"
+            if not errors:
+                new_options = self.config_entry_local.options.copy()
+                new_options.update(user_input)
+                return self.async_create_entry(title="", data=new_options)
 
         current_port = self.config_entry_local.data.get(CONF_PORT, DEFAULT_PORT)
         current_interval = self.config_entry_local.data.get(CONF_POLLING_INTERVAL, DEFAULT_POLLING_INTERVAL)
@@ -70,14 +115,49 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
         current_port = self.config_entry_local.options.get(CONF_PORT, current_port)
         current_interval = self.config_entry_local.options.get(CONF_POLLING_INTERVAL, current_interval)
         current_persist = self.config_entry_local.options.get(CONF_PERSIST_STATES, current_persist)
+        current_device_rate = self.config_entry_local.options.get(CONF_RATE_LIMIT_DEVICE, DEFAULT_RATE_LIMIT_DEVICE)
+        current_address_rate = self.config_entry_local.options.get(CONF_RATE_LIMIT_ADDRESS, DEFAULT_RATE_LIMIT_ADDRESS)
+        current_metrics_port = self.config_entry_local.options.get(CONF_METRICS_PORT, DEFAULT_METRICS_PORT)
+        current_metrics_host = self.config_entry_local.options.get(CONF_METRICS_HOST, DEFAULT_METRICS_HOST)
+        current_lazy = self.config_entry_local.options.get(CONF_LAZY_ENTITIES, False)
+        current_workers = self.config_entry_local.options.get(CONF_WORKERS, DEFAULT_WORKERS)
+        current_offload = self.config_entry_local.options.get(CONF_OFFLOAD_THRESHOLD, DEFAULT_OFFLOAD_THRESHOLD)
+        current_listeners = self.config_entry_local.options.get(CONF_LISTENERS, "")
+        current_max_connections = self.config_entry_local.options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS)
+        current_connect_rate = self.config_entry_local.options.get(CONF_CONNECT_RATE, DEFAULT_CONNECT_RATE)
+        current_keepalive_idle = self.config_entry_local.options.get(CONF_KEEPALIVE_IDLE, DEFAULT_KEEPALIVE_IDLE)
+        current_keepalive_interval = self.config_entry_local.options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL)
+        current_user_timeout = self.config_entry_local.options.get(CONF_USER_TIMEOUT, DEFAULT_USER_TIMEOUT)
+        current_idle_timeout = self.config_entry_local.options.get(CONF_IDLE_TIMEOUT, DEFAULT_IDLE_TIMEOUT)
+        current_rto_min = self.config_entry_local.options.get(CONF_RTO_MIN, DEFAULT_RTO_MIN_MS)
+        current_rto_max = self.config_entry_local.options.get(CONF_RTO_MAX, DEFAULT_RTO_MAX_MS)
+        current_link_stats = self.config_entry_local.options.get(CONF_LINK_STATS_INTERVAL, DEFAULT_LINK_STATS_INTERVAL)
 
         return self.async_show_form(
             step_id="global_settings",
             data_schema=vol.Schema({
                 vol.Required(CONF_PORT, default=current_port): int,
+                vol.Optional(CONF_LISTENERS, default=current_listeners): str,
+                vol.Required(CONF_MAX_CONNECTIONS, default=current_max_connections): vol.All(int, vol.Range(min=0)),
+                vol.Required(CONF_CONNECT_RATE, default=current_connect_rate): vol.All(int, vol.Range(min=0)),
+                vol.Required(CONF_KEEPALIVE_IDLE, default=current_keepalive_idle): vol.All(int, vol.Range(min=0, max=32767)),
+                vol.Required(CONF_KEEPALIVE_INTERVAL, default=current_keepalive_interval): vol.All(int, vol.Range(min=0, max=32767)),
+                vol.Required(CONF_USER_TIMEOUT, default=current_user_timeout): vol.All(int, vol.Range(min=0)),
+                vol.Required(CONF_IDLE_TIMEOUT, default=current_idle_timeout): vol.All(int, vol.Range(min=0)),
                 vol.Required(CONF_POLLING_INTERVAL, default=current_interval): int,
-                vol.Required(CONF_PERSIST_STATES, default=current_persist): bool
-            })
+                vol.Required(CONF_RTO_MIN, default=current_rto_min): vol.All(int, vol.Range(min=10)),
+                vol.Required(CONF_RTO_MAX, default=current_rto_max): vol.All(int, vol.Range(min=10)),
+                vol.Required(CONF_LINK_STATS_INTERVAL, default=current_link_stats): vol.All(int, vol.Range(min=0)),
+                vol.Required(CONF_PERSIST_STATES, default=current_persist): bool,
+                vol.Required(CONF_RATE_LIMIT_DEVICE, default=current_device_rate): vol.All(int, vol.Range(min=0)),
+                vol.Required(CONF_RATE_LIMIT_ADDRESS, default=current_address_rate): vol.All(int, vol.Range(min=0)),
+                vol.Required(CONF_METRICS_PORT, default=current_metrics_port): vol.All(int, vol.Range(min=0, max=65535)),
+                vol.Required(CONF_METRICS_HOST, default=current_metrics_host): str,
+                vol.Required(CONF_LAZY_ENTITIES, default=current_lazy): bool,
+                vol.Required(CONF_WORKERS, default=current_workers): vol.All(int, vol.Range(min=0, max=MAX_WORKERS)),
+                vol.Required(CONF_OFFLOAD_THRESHOLD, default=current_offload): vol.All(int, vol.Range(min=0, max=65535))
+            }),
+            errors=errors
         )
 
     async def async_step_add_device(self, user_input=None):
@@ -93,6 +173,16 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
             # Check for duplicate identnr
             if str(identnr) in existing_devices:
                 errors["base"] = "ident_already_exists"
+
+            try:
+                parse_address_list(user_input.get(CONF_IMPORTANT_ADDRESSES, ""))
+            except ValueError:
+                errors["base"] = "important_addresses_invalid"
+
+            try:
+                parse_networks(user_input.get(CONF_ALLOWED_IPS, ""))
+            except ValueError:
+                errors["base"] = "allowed_ips_invalid"
             
             if not errors and encrypted:
                 if not keynr or not key:
@@ -128,6 +218,8 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
                     "vds_area": user_input.get(CONF_VDS_AREA, 1),
                     "vds_outputs": user_input.get(CONF_VDS_OUTPUTS, 0),
                     "test_interval": user_input.get(CONF_TEST_INTERVAL, 0),
+                    "important_addresses": user_input.get(CONF_IMPORTANT_ADDRESSES, ""),
+                    "allowed_ips": user_input.get(CONF_ALLOWED_IPS, ""),
                 }
                 
                 new_options[CONF_DEVICES] = devices
@@ -144,6 +236,8 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional(CONF_VDS_AREA, default=1): int,
                 vol.Optional(CONF_VDS_OUTPUTS, default=0): int,
                 vol.Optional(CONF_TEST_INTERVAL, default=0): int,
+                vol.Optional(CONF_IMPORTANT_ADDRESSES, default=""): str,
+                vol.Optional(CONF_ALLOWED_IPS, default=""): str,
             }),
             errors=errors
         )
@@ -178,8 +272,18 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
             encrypted = user_input.get(CONF_ENCRYPT, True)
             key = user_input.get(CONF_KEY, "")
             keynr = user_input.get(CONF_KEYNR)
+
+            try:
+                parse_address_list(user_input.get(CONF_IMPORTANT_ADDRESSES, ""))
+            except ValueError:
+                errors["base"] = "important_addresses_invalid"
+
+            try:
+                parse_networks(user_input.get(CONF_ALLOWED_IPS, ""))
+            except ValueError:
+                errors["base"] = "allowed_ips_invalid"
             
-            if encrypted:
+            if not errors and encrypted:
                 if not keynr or not key:
                     errors["base"] = "key_required"
                 elif len(key) != 32:
@@ -201,7 +305,8 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
             
             if not errors:
                 # Update existing device entry
-                devices[self._selected_device_id].update({
+                devices[self._selected_device_id] = {
+                    **devices[self._selected_device_id],
                     "encrypted": encrypted,
                     "keynr": keynr or 0,
                     "key": key,
@@ -209,7 +314,9 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
                     "vds_area": user_input.get(CONF_VDS_AREA, 1),
                     "vds_outputs": user_input.get(CONF_VDS_OUTPUTS, 0),
                     "test_interval": user_input.get(CONF_TEST_INTERVAL, 0),
-                })
+                    "important_addresses": user_input.get(CONF_IMPORTANT_ADDRESSES, ""),
+                    "allowed_ips": user_input.get(CONF_ALLOWED_IPS, ""),
+                }
                 
                 new_options = self.config_entry_local.options.copy()
                 new_options[CONF_DEVICES] = devices
@@ -226,6 +333,8 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional(CONF_VDS_AREA, default=device_data.get("vds_area", 1)): int,
                 vol.Optional(CONF_VDS_OUTPUTS, default=device_data.get("vds_outputs", 0)): int,
                 vol.Optional(CONF_TEST_INTERVAL, default=device_data.get("test_interval", 0)): int,
+                vol.Optional(CONF_IMPORTANT_ADDRESSES, default=device_data.get("important_addresses", "")): str,
+                vol.Optional(CONF_ALLOWED_IPS, default=device_data.get("allowed_ips", "")): str,
             }),
             description_placeholders={"ident": device_data.get("identnr")},
             errors=errors
@@ -246,8 +355,9 @@ class VdSOptionsFlowHandler(config_entries.OptionsFlow):
                 del devices[key_to_remove]
             new_options[CONF_DEVICES] = devices
 
-            # 3. Also cleanup discovered_sensors for this identnr
-            if removed_ident:
+            # 3. Also cleanup legacy discovered_sensors for this identnr
+            # (migrated to storage, which is cleaned up by the running hub)
+            if removed_ident and "discovered_sensors" in new_options:
                 discovered = new_options.get("discovered_sensors", [])
                 new_discovered = [s for s in discovered if str(s.get("ident")) != removed_ident]
                 new_options["discovered_sensors"] = new_discovered
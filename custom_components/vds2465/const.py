@@ -11,9 +11,62 @@ CONF_VDS_OUTPUTS = "vds_outputs"
 CONF_TEST_INTERVAL = "test_interval"
 CONF_POLLING_INTERVAL = "polling_interval"
 CONF_PERSIST_STATES = "persist_states"
+CONF_RATE_LIMIT_DEVICE = "rate_limit_device"
+CONF_RATE_LIMIT_ADDRESS = "rate_limit_address"
+CONF_METRICS_PORT = "metrics_port"
+CONF_METRICS_HOST = "metrics_host"
+CONF_LAZY_ENTITIES = "lazy_entities"
+CONF_IMPORTANT_ADDRESSES = "important_addresses"
+CONF_WORKERS = "workers"
+CONF_OFFLOAD_THRESHOLD = "offload_threshold"
+CONF_LISTENERS = "listeners"
+CONF_MAX_CONNECTIONS = "max_connections"
+CONF_CONNECT_RATE = "connect_rate"
+CONF_ALLOWED_IPS = "allowed_ips"
+CONF_KEEPALIVE_IDLE = "keepalive_idle"
+CONF_KEEPALIVE_INTERVAL = "keepalive_interval"
+CONF_USER_TIMEOUT = "user_timeout"
+CONF_IDLE_TIMEOUT = "idle_timeout"
+CONF_RTO_MIN = "rto_min"
+CONF_RTO_MAX = "rto_max"
+CONF_LINK_STATS_INTERVAL = "link_stats_interval"
 
 DEFAULT_PORT = 4100
 DEFAULT_POLLING_INTERVAL = 5
+# Alarm events per minute (0 = unlimited); off unless configured, so no alarm is held back by default
+DEFAULT_RATE_LIMIT_DEVICE = 0
+DEFAULT_RATE_LIMIT_ADDRESS = 0
+FLOOD_SUMMARY_INTERVAL = 60
+# Port of the optional OpenMetrics endpoint (0 = disabled)
+DEFAULT_METRICS_PORT = 0
+# The endpoint has no authentication; only reachable from the HA host unless changed
+DEFAULT_METRICS_HOST = "127.0.0.1"
+# Protocol worker processes (0 = run in the Home Assistant process)
+DEFAULT_WORKERS = 0
+MAX_WORKERS = 16
+# Frames of at least this many bytes are encoded/decoded in the executor (0 = never).
+# Below about 128 bytes the hand-off costs the loop more than the work (tests/bench_offload.py)
+DEFAULT_OFFLOAD_THRESHOLD = 512
+# Admission control before the handshake (0 = unlimited)
+DEFAULT_MAX_CONNECTIONS = 0
+# Connection attempts per minute and source address (0 = unlimited)
+DEFAULT_CONNECT_RATE = 0
+# Dead peer detection in seconds (0 = off / system default)
+DEFAULT_KEEPALIVE_IDLE = 60
+DEFAULT_KEEPALIVE_INTERVAL = 10
+DEFAULT_USER_TIMEOUT = 0
+DEFAULT_IDLE_TIMEOUT = 0
+# Bounds of the adaptive retransmission timeout in milliseconds. The lower bound follows
+# RFC 6298 (1 s): a transmitter that is only slow to answer once must survive the backoff
+DEFAULT_RTO_MIN_MS = 1000
+DEFAULT_RTO_MAX_MS = 60000
+# Seconds between two link statistics reports per device (0 = off)
+DEFAULT_LINK_STATS_INTERVAL = 10
+# Seconds to wait for the feedback record of a switched output
+OUTPUT_CONFIRM_TIMEOUT = 30
+
+STORAGE_KEY_DISCOVERED = DOMAIN + ".{entry_id}.discovered"
+STORAGE_KEY_ADDRESS_STATES = DOMAIN + ".{entry_id}.address_states"
 
 EVENT_VDS_ALARM = "vds2465_alarm"
 EVENT_VDS_MONITORING = "vds2465_monitoring_alert"
\ No newline at end of file
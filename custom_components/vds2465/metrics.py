@@ -0,0 +1,311 @@
+import array
+import asyncio
+import bisect
+import collections
+import logging
+import math
+
+_LOGGER = logging.getLogger(__name__)
+
+PREFIX = "vds2465"
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Seconds; spans a local CRC check up to a slow mobile round trip
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> help text. Counters that are not labelled by IK.
+COUNTERS = {
+    "crc_errors": "Frames dropped because of a checksum mismatch",
+    "unknown_keynr": "Frames rejected because of an unknown KeyNr",
+    "unknown_identnr": "Connections rejected because of an unknown Identnr",
+    "retransmits": "Frames retransmitted after the response timer expired",
+    "duplicate_frames": "Retransmitted data frames that were acked but not dispatched",
+    "suppressed_events": "Alarm events held back by the rate limiter",
+    "rejected_connections": "Connections closed before the handshake (limits, admission control)",
+    "reaped_connections": "Connections closed after receiving no valid frame for the idle timeout",
+    "expired_output_commands": "Output commands for a disconnected device dropped after their TTL or over the queue limit",
+}
+
+# Per-device counters reported by the connections in "link_stats" events
+LINK_COUNTERS = ("frames", "retransmits", "crc_errors", "rtt_sum", "rtt_count")
+# Per-device window: LINK_WINDOW_BUCKETS buckets of LINK_BUCKET_SECONDS each
+LINK_WINDOW_BUCKETS = 5
+LINK_BUCKET_SECONDS = 60
+
+HISTOGRAMS = {
+    "rx_to_ack_seconds": "Time from receiving a frame until the response is sent",
+    "decrypt_seconds": "Time spent decrypting and checksumming a frame",
+    "parse_seconds": "Time spent parsing a frame",
+    "round_trip_seconds": "Time from sending a frame until the transmitter's reply",
+}
+
+# Log-spaced RTT buckets from 1 ms to ~45 s, each bound 25 % above the previous one
+RTT_BOUNDS = tuple(0.001 * 1.25 ** i for i in range(49))
+# Counts are halved once this many samples are held, so old samples fade out
+RTT_DECAY_AT = 512
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative on render, like Prometheus)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q):
+        """Upper bucket bound containing quantile q (None without samples)."""
+        if not self.count:
+            return None
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class WindowedCounters:
+    """Sums of LINK_COUNTERS over a sliding window of fixed time buckets.
+
+    The ring never grows; a bucket is cleared when the clock comes round to it again.
+    """
+
+    __slots__ = ("width", "epochs", "rows", "started", "queue_depth", "rtt_quantiles")
+
+    def __init__(self, now, buckets=LINK_WINDOW_BUCKETS, width=LINK_BUCKET_SECONDS):
+        self.width = width
+        self.epochs = [None] * buckets
+        self.rows = [[0] * len(LINK_COUNTERS) for _ in range(buckets)]
+        self.started = now
+        # Latest gauges of the connection, not windowed
+        self.queue_depth = 0
+        self.rtt_quantiles = {}
+
+    @property
+    def window(self):
+        return self.width * len(self.epochs)
+
+    def add(self, now, values):
+        epoch = int(now // self.width)
+        i = epoch % len(self.epochs)
+        row = self.rows[i]
+        if self.epochs[i] != epoch:
+            self.epochs[i] = epoch
+            row[:] = [0] * len(LINK_COUNTERS)
+        for j, name in enumerate(LINK_COUNTERS):
+            row[j] += values.get(name, 0)
+
+    def totals(self, now):
+        """Sums per counter over the buckets still inside the window."""
+        oldest = int(now // self.width) - len(self.epochs) + 1
+        sums = [0] * len(LINK_COUNTERS)
+        for epoch, row in zip(self.epochs, self.rows):
+            if epoch is not None and epoch >= oldest:
+                for j, value in enumerate(row):
+                    sums[j] += value
+        return dict(zip(LINK_COUNTERS, sums))
+
+    def span(self, now):
+        """Seconds actually covered by the window (shorter right after the first report)."""
+        return max(self.width, min(self.window, now - self.started))
+
+
+class LatencyQuantiles:
+    """Streaming quantile estimate over log-spaced buckets (HDR style).
+
+    Fixed memory per instance, quantiles within one bucket (25 %) of the true value.
+    Counts stay below RTT_DECAY_AT, so 16 bits per bucket suffice.
+    """
+
+    __slots__ = ("counts", "count")
+
+    def __init__(self):
+        self.counts = array.array("H", bytes(2 * (len(RTT_BOUNDS) + 1)))
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(RTT_BOUNDS, seconds)] += 1
+        self.count += 1
+        if self.count >= RTT_DECAY_AT:
+            for i, n in enumerate(self.counts):
+                self.counts[i] = n >> 1
+            self.count = sum(self.counts)
+
+    def quantile(self, q):
+        """Upper bucket bound containing quantile q (None without samples)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bound, n in zip(RTT_BOUNDS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return RTT_BOUNDS[-1]
+
+
+class ReceiverMetrics:
+    """Counters and histograms of one receiver, shared by all its connections."""
+
+    def __init__(self):
+        self.frames_rx = collections.Counter()  # IK -> count
+        self.frames_tx = collections.Counter()
+        self.counters = collections.Counter()
+        self.histograms = {name: Histogram() for name in HISTOGRAMS}
+        # name -> callable returning the current value, registered by the owner
+        self.gauges = {}
+
+    def inc(self, name, n=1):
+        self.counters[name] += n
+
+    def observe(self, name, value):
+        self.histograms[name].observe(value)
+
+    def add_gauge(self, name, func, help_text=""):
+        self.gauges[name] = (func, help_text)
+
+    def gauge(self, name):
+        func, _ = self.gauges[name]
+        return func()
+
+    def snapshot(self):
+        """Picklable copy of all counters and histograms (for worker processes)."""
+        return {
+            "frames_rx": dict(self.frames_rx),
+            "frames_tx": dict(self.frames_tx),
+            "counters": dict(self.counters),
+            "histograms": {
+                name: (list(hist.counts), hist.sum, hist.count) for name, hist in self.histograms.items()
+            },
+        }
+
+    def add_delta(self, current, previous):
+        """Add the difference between two snapshots of another instance."""
+        previous = previous or {}
+        for attr in ("frames_rx", "frames_tx", "counters"):
+            target = getattr(self, attr)
+            before = previous.get(attr, {})
+            for key, value in current[attr].items():
+                target[key] += value - before.get(key, 0)
+        before_hists = previous.get("histograms", {})
+        for name, (counts, total, count) in current["histograms"].items():
+            hist = self.histograms[name]
+            old_counts, old_total, old_count = before_hists.get(name, ([0] * len(counts), 0.0, 0))
+            for i, (new_n, old_n) in enumerate(zip(counts, old_counts)):
+                hist.counts[i] += new_n - old_n
+            hist.sum += total - old_total
+            hist.count += count - old_count
+
+    def render(self):
+        """Render all metrics in OpenMetrics text format."""
+        lines = []
+
+        for name, counter, help_text in (
+            ("frames_received", self.frames_rx, "Frames received by IK"),
+            ("frames_sent", self.frames_tx, "Frames sent by IK"),
+        ):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"# HELP {metric} {help_text}")
+            for ik, value in sorted(counter.items()):
+                lines.append(f'{metric}_total{{ik="{ik}"}} {value}')
+
+        for name, help_text in COUNTERS.items():
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"{metric}_total {self.counters[name]}")
+
+        for name, (func, help_text) in self.gauges.items():
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            if help_text:
+                lines.append(f"# HELP {metric} {help_text}")
+            try:
+                lines.append(f"{metric} {func()}")
+            except Exception as e:
+                _LOGGER.debug(f"Gauge {name} failed: {e}")
+
+        for name, help_text in HISTOGRAMS.items():
+            hist = self.histograms[name]
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            lines.append(f"# HELP {metric} {help_text}")
+            cumulative = 0
+            for bound, n in zip(hist.bounds, hist.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+            lines.append(f"{metric}_count {hist.count}")
+            lines.append(f"{metric}_sum {hist.sum}")
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHttpServer:
+    """Minimal HTTP server answering GET /metrics with the rendered metrics."""
+
+    def __init__(self, host, port, render):
+        self.host = host
+        self.port = port
+        self.render = render
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address=True)
+        _LOGGER.info(f"VdS metrics endpoint listening on {self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            try:
+                await asyncio.wait_for(self.server.wait_closed(), timeout=2.0)
+            except Exception:
+                pass
+            self.server = None
+
+    async def handle_client(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            # Drain the request headers
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, content_type, body = "200 OK", CONTENT_TYPE, self.render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not Found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, ValueError, asyncio.LimitOverrunError) as e:
+            # ValueError: request or header line longer than the stream limit
+            _LOGGER.debug(f"Metrics request failed: {e!r}")
+        finally:
+            writer.close()
@@ -0,0 +1,90 @@
+from homeassistant.exceptions import HomeAssistantError
+
+
+class PendingOutputs:
+    """Output commands waiting for the device's feedback record.
+
+    A command's future resolves with the reported state once an "Ausgang"
+    record for its address arrives. It fails when the device reports an
+    error (0x11 carries no address, so all commands of that device fail),
+    disconnects, or stays silent for `timeout` seconds (or the timeout
+    given to add()). Commands parked in the server's queue for a device
+    that is not connected survive disconnects until the device has
+    connected again (see delivered()).
+    """
+
+    def __init__(self, loop, timeout):
+        self._loop = loop
+        self.timeout = timeout
+        # identnr -> {address: [[future, timer handle, parked]]}
+        self._pending = {}
+
+    def add(self, identnr, address, future, timeout=None, parked=False):
+        timeout = self.timeout if timeout is None else timeout
+        handle = self._loop.call_later(timeout, self._expire, identnr, address, future, timeout)
+        self._pending.setdefault(identnr, {}).setdefault(address, []).append([future, handle, parked])
+
+    def delivered(self, identnr):
+        """The device connected, so its parked commands are on their way now."""
+        for waiting in self._pending.get(identnr, {}).values():
+            for entry in waiting:
+                entry[2] = False
+
+    def confirm(self, identnr, address, state):
+        """Resolve every command waiting on this address. Returns how many were waiting."""
+        by_address = self._pending.get(identnr)
+        if not by_address or address not in by_address:
+            return 0
+        waiting = by_address.pop(address)
+        if not by_address:
+            del self._pending[identnr]
+        for future, handle, _ in waiting:
+            handle.cancel()
+            if not future.done():
+                future.set_result(state)
+        return len(waiting)
+
+    def fail(self, identnr, message, keep_parked=False):
+        """Fail every command waiting on this device, except parked ones with keep_parked."""
+        by_address = self._pending.pop(identnr, None)
+        if not by_address:
+            return 0
+        count = 0
+        kept = {}
+        for address, waiting in by_address.items():
+            for entry in waiting:
+                future, handle, parked = entry
+                if parked and keep_parked:
+                    kept.setdefault(address, []).append(entry)
+                    continue
+                handle.cancel()
+                if not future.done():
+                    future.set_exception(HomeAssistantError(message))
+                count += 1
+        if kept:
+            self._pending[identnr] = kept
+        return count
+
+    def cancel_all(self):
+        for by_address in self._pending.values():
+            for waiting in by_address.values():
+                for future, handle, _ in waiting:
+                    handle.cancel()
+                    future.cancel()
+        self._pending.clear()
+
+    def _expire(self, identnr, address, future, timeout):
+        waiting = self._pending.get(identnr, {}).get(address)
+        if waiting:
+            waiting[:] = [entry for entry in waiting if entry[0] is not future]
+            if not waiting:
+                del self._pending[identnr][address]
+                if not self._pending[identnr]:
+                    del self._pending[identnr]
+        if not future.done():
+            future.set_exception(HomeAssistantError(
+                f"No feedback from VdS device {identnr} for output {address} within {timeout}s"
+            ))
+
+    def __len__(self):
+        return sum(len(waiting) for by_address in self._pending.values() for waiting in by_address.values())
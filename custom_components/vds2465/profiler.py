@@ -0,0 +1,81 @@
+import asyncio
+import cProfile
+import datetime
+import logging
+import pstats
+
+_LOGGER = logging.getLogger(__name__)
+
+# Protocol entry points summarized in the log / service response
+PROFILE_TARGETS = ("controller", "process_packet", "parse_vds_payload", "handle_vds_event")
+
+_profile_lock = asyncio.Lock()
+
+
+def _summarize(profiler, path):
+    """Dump the stats file and extract the protocol entry points (runs in executor)."""
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler)
+    summary = {}
+    for (filename, _line, name), (_cc, calls, tottime, cumtime, _callers) in stats.stats.items():
+        if name in PROFILE_TARGETS and "vds2465" in filename:
+            summary[name] = {"calls": calls, "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+    return summary
+
+
+async def profile_loop(seconds, path):
+    """Run cProfile on the running event loop for `seconds`, write `path` and return the summary.
+
+    Used by the service and, with worker processes, inside every worker.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    return await asyncio.get_running_loop().run_in_executor(None, _summarize, profiler, path)
+
+
+def _log_summary(label, summary):
+    for name, values in summary.items():
+        _LOGGER.info(f"VdS profile {label}{name}: {values['calls']} calls, {values['cumtime']:.4f}s cumulative")
+
+
+async def async_profile(hass, seconds, servers=()):
+    """Run cProfile on the event loop thread for `seconds` and write a pstats file to the config dir.
+
+    Servers with worker processes profile each worker for the same time, into
+    one file per worker. Nothing is hooked while no profile is running.
+    """
+    if _profile_lock.locked():
+        raise RuntimeError("A VdS profile is already running")
+
+    async with _profile_lock:
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = hass.config.path(f"vds2465_profile_{stamp}.prof")
+        sharded = [server for server in servers if hasattr(server, "profile_workers")]
+
+        def worker_path(index, worker_id):
+            prefix = f"{index}-" if len(sharded) > 1 else ""
+            return hass.config.path(f"vds2465_profile_{stamp}_worker{prefix}{worker_id}.prof")
+
+        _LOGGER.info(f"Profiling VdS receiver for {seconds}s")
+        summary, *worker_results = await asyncio.gather(
+            profile_loop(seconds, path),
+            *(
+                server.profile_workers(seconds, lambda worker_id, index=index: worker_path(index, worker_id))
+                for index, server in enumerate(sharded)
+            ),
+        )
+        _log_summary("", summary)
+        _LOGGER.info(f"VdS profile written to {path}")
+        result = {"file": path, "functions": summary}
+
+        workers = [entry for results in worker_results for entry in results]
+        for entry in workers:
+            _log_summary(f"worker {entry['worker']} ", entry["functions"])
+            _LOGGER.info(f"VdS worker {entry['worker']} profile written to {entry['file']}")
+        if workers:
+            result["workers"] = workers
+        return result
@@ -0,0 +1,97 @@
+import time
+
+
+class TokenBucket:
+    """Token bucket refilling `rate_per_minute` tokens per minute, holding at most `capacity`."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate_per_minute, capacity=None, now=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic() if now is None else now
+
+    def available(self, now=None):
+        """Refill up to `now` and return True if a token is available, without taking it."""
+        if now is None:
+            now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens >= 1
+
+    def consume(self, now=None):
+        """Take one token. Returns False if the bucket is empty."""
+        if self.available(now):
+            self.tokens -= 1
+            return True
+        return False
+
+
+class FloodGuard:
+    """Per-key token buckets plus bookkeeping of what was suppressed.
+
+    A rate of 0 disables the guard; every event is admitted.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute
+        self._buckets = {}
+
+    def admit(self, key, now=None):
+        if self.rate <= 0:
+            return True
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, now=now)
+        return bucket.consume(now)
+
+    def check(self, key, now=None):
+        """True if admit(key) would succeed; takes no token."""
+        if self.rate <= 0:
+            return True
+        bucket = self._buckets.get(key)
+        return bucket is None or bucket.available(now)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def prune(self, now=None):
+        """Forget buckets that have refilled completely; they behave like new ones."""
+        if now is None:
+            now = time.monotonic()
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket.tokens + (now - bucket.updated) * bucket.rate < bucket.capacity
+        }
+
+
+class SuppressedEvents:
+    """Collects events dropped by a FloodGuard until they are summarized."""
+
+    def __init__(self):
+        self._pending = {}  # key -> [count, first_seen, last_event_type, last_data]
+
+    def add(self, key, event_type, data, now=None):
+        if now is None:
+            now = time.monotonic()
+        entry = self._pending.get(key)
+        if entry is None:
+            self._pending[key] = [1, now, event_type, data]
+        else:
+            entry[0] += 1
+            entry[2] = event_type
+            entry[3] = data
+
+    def pop_all(self, now=None):
+        """Return and clear (key, count, seconds, last_event_type, last_data) tuples."""
+        if now is None:
+            now = time.monotonic()
+        pending, self._pending = self._pending, {}
+        return [
+            (key, count, max(1, int(now - first_seen)), event_type, data)
+            for key, (count, first_seen, event_type, data) in pending.items()
+        ]
+
+    def __len__(self):
+        return len(self._pending)
@@ -1,15 +1,26 @@
 import logging
-from homeassistant.components.sensor import SensorEntity
+import time
+from datetime import timedelta
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
 from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.storage import Store
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.util import dt as dt_util
-from .const import DOMAIN, CONF_DEVICES, CONF_PERSIST_STATES
+from .const import DOMAIN, CONF_DEVICES, CONF_PERSIST_STATES, STORAGE_KEY_DISCOVERED
+from .vds_lib import intern_identnr
 
 _LOGGER = logging.getLogger(__name__)
 
+# Only the receiver metric sensors poll
+SCAN_INTERVAL = timedelta(seconds=30)
+
+DISCOVERED_STORAGE_VERSION = 1
+# Bursts of newly discovered addresses are written in one go
+DISCOVERED_SAVE_DELAY = 10
+
 # Persistent device-level attributes
 VDS_PERSISTENT_ATTRIBUTES = [
     "identnr"
@@ -34,6 +45,64 @@ VDS_MESSAGE_ATTRIBUTES = [
     "msg_text"
 ]
 
+def _ms(value):
+    return round(value * 1000, 2) if value is not None else None
+
+# key, name, icon, unit, state_class, value function(metrics)
+RECEIVER_SENSORS = [
+    ("active_connections", "Active Connections", "mdi:lan-connect", None, SensorStateClass.MEASUREMENT,
+     lambda m: m.gauge("active_connections")),
+    ("send_queue_depth", "Send Queue Depth", "mdi:tray-full", None, SensorStateClass.MEASUREMENT,
+     lambda m: m.gauge("send_queue_depth")),
+    ("frames_received", "Frames Received", "mdi:download-network", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: sum(m.frames_rx.values())),
+    ("frames_sent", "Frames Sent", "mdi:upload-network", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: sum(m.frames_tx.values())),
+    ("crc_errors", "CRC Errors", "mdi:alert-circle-check", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["crc_errors"]),
+    ("unknown_peers", "Rejected Unknown Peers", "mdi:account-question", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["unknown_keynr"] + m.counters["unknown_identnr"]),
+    ("retransmits", "Retransmits", "mdi:repeat", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["retransmits"]),
+    ("duplicate_frames", "Duplicate Frames", "mdi:content-duplicate", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["duplicate_frames"]),
+    ("suppressed_events", "Suppressed Events", "mdi:filter-remove", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["suppressed_events"]),
+    ("rejected_connections", "Rejected Connections", "mdi:lan-disconnect", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["rejected_connections"]),
+    ("reaped_connections", "Reaped Idle Connections", "mdi:timer-off-outline", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["reaped_connections"]),
+    ("pending_outputs", "Pending Output Commands", "mdi:tray-arrow-up", None, SensorStateClass.MEASUREMENT,
+     lambda m: m.gauge("pending_output_commands")),
+    ("expired_outputs", "Expired Output Commands", "mdi:timer-sand-complete", None, SensorStateClass.TOTAL_INCREASING,
+     lambda m: m.counters["expired_output_commands"]),
+    ("rx_to_ack", "Response Time (p95)", "mdi:timer-outline", "ms", SensorStateClass.MEASUREMENT,
+     lambda m: _ms(m.histograms["rx_to_ack_seconds"].quantile(0.95))),
+    ("round_trip", "Round Trip Time (p95)", "mdi:timer-sync-outline", "ms", SensorStateClass.MEASUREMENT,
+     lambda m: _ms(m.histograms["round_trip_seconds"].quantile(0.95))),
+    ("decrypt_time", "Decrypt Time (avg)", "mdi:lock-clock", "ms", SensorStateClass.MEASUREMENT,
+     lambda m: _ms(m.histograms["decrypt_seconds"].mean)),
+    ("parse_time", "Parse Time (avg)", "mdi:timer-cog-outline", "ms", SensorStateClass.MEASUREMENT,
+     lambda m: _ms(m.histograms["parse_seconds"].mean)),
+]
+
+def _link_rate(totals, window, now):
+    return round(totals["frames"] * 60 / window.span(now), 1)
+
+def _link_rtt(totals, window, now):
+    if not totals["rtt_count"]:
+        return None
+    return _ms(totals["rtt_sum"] / totals["rtt_count"])
+
+# key, name, icon, unit, value function(totals, window, now); totals cover the last 5 minutes
+LINK_SENSORS = [
+    ("frames_per_minute", "Frames per Minute", "mdi:swap-vertical", "frames/min", _link_rate),
+    ("retransmits", "Retransmits (5 min)", "mdi:repeat", None, lambda t, w, now: t["retransmits"]),
+    ("crc_errors", "CRC Errors (5 min)", "mdi:alert-circle-check", None, lambda t, w, now: t["crc_errors"]),
+    ("round_trip_time", "Round Trip Time (avg)", "mdi:timer-sync-outline", "ms", _link_rtt),
+    ("queue_depth", "Send Queue Depth", "mdi:tray-full", None, lambda t, w, now: w.queue_depth),
+]
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -49,18 +118,40 @@ async def async_setup_entry(
         entities.append(VdsLastMessageSensor(hub, dev_conf, persist))
         entities.append(VdsLastTestMessageSensor(hub, dev_conf, persist))
         entities.append(VdsManufacturerSensor(hub, dev_conf, persist))
+        entities.extend(VdsLinkSensor(hub, dev_conf, *description) for description in LINK_SENSORS)
 
-    async_add_entities(entities)
+    for description in RECEIVER_SENSORS:
+        entities.append(VdsReceiverSensor(hub, entry.entry_id, *description))
 
     # Init Sensor Manager for dynamic address sensors
     manager = VdsSensorManager(hass, hub, entry, async_add_entities, persist)
     
-    # ALWAYS restore dynamically discovered sensors entities from options
+    # ALWAYS restore dynamically discovered sensors entities from storage
     # This ensures sensors don't disappear if persistence is disabled.
-    await manager.restore_discovered_sensors()
+    await manager.async_load()
+    entities.extend(manager.restore_discovered_sensors())
+
+    async_add_entities(entities)
         
     entry.async_on_unload(manager.unload)
 
+    @callback
+    def device_changed(old_conf, new_conf):
+        """Add sensors for devices added at runtime, forget removed ones."""
+        if old_conf is None:
+            async_add_entities([
+                VdsLastMessageSensor(hub, new_conf, persist),
+                VdsLastTestMessageSensor(hub, new_conf, persist),
+                VdsManufacturerSensor(hub, new_conf, persist),
+                *(VdsLinkSensor(hub, new_conf, *description) for description in LINK_SENSORS),
+            ])
+        elif new_conf is None:
+            manager.forget_device(old_conf.get("identnr"))
+
+    entry.async_on_unload(hub.register_device_handler("sensor", device_changed))
+    entry.async_on_unload(hub.register_materializer("addr", lambda ident, addr: manager.materialize(ident, addr, "addr")))
+    entry.async_on_unload(hub.register_materializer("out", lambda ident, addr: manager.materialize(ident, addr, "out")))
+
 
 class VdsSensorManager:
     """Manages dynamic creation of sensors for VdS addresses."""
@@ -72,6 +163,8 @@ class VdsSensorManager:
         self.async_add_entities = async_add_entities
         self.persist = persist
         self.known_sensors = set() # (identnr, adresse, type_prefix) tuples
+        self._store = Store(hass, DISCOVERED_STORAGE_VERSION, STORAGE_KEY_DISCOVERED.format(entry_id=entry.entry_id))
+        self._pending_entities = []
         self._remove_listener = self.hub.add_listener(self._handle_event)
 
     def unload(self):
@@ -80,29 +173,50 @@ class VdsSensorManager:
             self._remove_listener()
             self._remove_listener = None
 
-    async def restore_discovered_sensors(self):
-        """Re-create previously discovered sensors from storage."""
-        discovered = self.entry.options.get("discovered_sensors", [])
-        if not discovered:
-            return
-            
-        entities = []
+    def forget_device(self, identnr):
+        """Drop discovered keys of a removed device so it can be rediscovered."""
+        identnr = str(identnr)
+        self.known_sensors = {key for key in self.known_sensors if key[0] != identnr}
+        self._schedule_save()
+
+    async def async_load(self):
+        """Load discovered sensors, migrating the legacy list from the entry options."""
+        data = await self._store.async_load()
+        if data is not None:
+            discovered = data.get("sensors", [])
+        else:
+            discovered = self.entry.options.get("discovered_sensors", [])
+
         for s in discovered:
-            identnr = s["ident"]
-            adresse = s["addr"]
-            prefix = s["type"]
-            key = (str(identnr), str(adresse), prefix)
-            
-            if key not in self.known_sensors:
-                self.known_sensors.add(key)
-                if prefix == "out":
-                    entities.append(VdsOutputSensor(self.hub, identnr, adresse, self.persist))
-                else:
-                    entities.append(VdsAddressSensor(self.hub, identnr, adresse, self.persist))
-        
-        if entities:
-            _LOGGER.debug(f"Restoring {len(entities)} discovered VdS sensors")
-            self.async_add_entities(entities)
+            self.known_sensors.add((str(s["ident"]), int(s["addr"]), s["type"]))
+
+        if data is None and "discovered_sensors" in self.entry.options:
+            _LOGGER.info(f"Migrating {len(self.known_sensors)} discovered VdS sensors to storage")
+            await self._store.async_save(self._data_to_save())
+            new_options = {k: v for k, v in self.entry.options.items() if k != "discovered_sensors"}
+            self.hass.config_entries.async_update_entry(self.entry, options=new_options)
+
+    def restore_discovered_sensors(self):
+        """Create entities for all previously discovered sensors."""
+        entities = []
+        for identnr, adresse, prefix in self.known_sensors:
+            if prefix == "out":
+                entities.append(VdsOutputSensor(self.hub, identnr, adresse, self.persist))
+            else:
+                entities.append(VdsAddressSensor(self.hub, identnr, adresse, self.persist))
+        _LOGGER.debug(f"Restoring {len(entities)} discovered VdS sensors")
+        return entities
+
+    def _data_to_save(self):
+        return {
+            "sensors": [
+                {"ident": identnr, "addr": adresse, "type": prefix}
+                for identnr, adresse, prefix in sorted(self.known_sensors)
+            ]
+        }
+
+    def _schedule_save(self):
+        self._store.async_delay_save(self._data_to_save, DISCOVERED_SAVE_DELAY)
 
     def _handle_event(self, event_type, data):
         """Listen for alarms to discover new addresses."""
@@ -121,30 +235,52 @@ class VdsSensorManager:
         
         # Use different key prefix for map to distinguish address vs output sensors for same address ID
         type_prefix = "out" if is_output else "addr"
-        key = (str(identnr), str(adresse), type_prefix)
+        key = (str(identnr), int(adresse), type_prefix)
         
         if key not in self.known_sensors:
-            self.known_sensors.add(key)
-            
-            if is_output:
-                _LOGGER.info(f"Discovered new VdS output feedback: {identnr} / {adresse}")
-                sensor = VdsOutputSensor(self.hub, identnr, adresse, self.persist)
-            else:
-                _LOGGER.info(f"Discovered new VdS address: {identnr} / {adresse}")
-                sensor = VdsAddressSensor(self.hub, identnr, adresse, self.persist)
-                
-            self.async_add_entities([sensor])
-            
-            # ALWAYS save discovered sensors to options so they persist across restarts
-            discovered = self.entry.options.get("discovered_sensors", []).copy()
-            # Avoid duplicates
-            if not any(d["ident"] == str(identnr) and d["addr"] == int(adresse) and d["type"] == type_prefix for d in discovered):
-                discovered.append({"ident": str(identnr), "addr": int(adresse), "type": type_prefix})
-                
-                # Update options without triggering a full reload
-                new_options = self.entry.options.copy()
-                new_options["discovered_sensors"] = discovered
-                self.hass.config_entries.async_update_entry(self.entry, options=new_options)
+            # Lazy mode: the hub table keeps the state, no entity unless important
+            if self.hub.lazy and not self.hub.is_important(identnr, adresse):
+                return
+            self._discover(key)
+
+    def materialize(self, identnr, adresse, type_prefix):
+        """Create the entity for an address on request, seeded from the hub table."""
+        key = (str(identnr), int(adresse), type_prefix)
+        if key in self.known_sensors:
+            return
+        initial = None
+        for state in self.hub.address_table.query(identnr, int(adresse)):
+            if state["kind"] == type_prefix:
+                initial = state
+        self._discover(key, initial)
+
+    def _discover(self, key, initial=None):
+        identnr, adresse, type_prefix = key
+        self.known_sensors.add(key)
+        
+        if type_prefix == "out":
+            _LOGGER.info(f"Discovered new VdS output feedback: {identnr} / {adresse}")
+            sensor = VdsOutputSensor(self.hub, identnr, adresse, self.persist)
+            if initial:
+                sensor._attr_native_value = initial["zustand"] or initial["text"]
+        else:
+            _LOGGER.info(f"Discovered new VdS address: {identnr} / {adresse}")
+            sensor = VdsAddressSensor(self.hub, identnr, adresse, self.persist)
+            if initial:
+                sensor._attr_native_value = initial["text"]
+
+        # Sensors discovered within one loop iteration (one packet) are added together
+        if not self._pending_entities:
+            self.hass.loop.call_soon(self._add_pending)
+        self._pending_entities.append(sensor)
+        
+        # ALWAYS save discovered sensors so they persist across restarts (debounced)
+        self._schedule_save()
+
+    def _add_pending(self):
+        entities, self._pending_entities = self._pending_entities, []
+        if entities and self._remove_listener:
+            self.async_add_entities(entities)
 
 
 class VdsAddressSensor(RestoreEntity, SensorEntity):
@@ -155,7 +291,7 @@ class VdsAddressSensor(RestoreEntity, SensorEntity):
 
     def __init__(self, hub, identnr, adresse, persist):
         self._hub = hub
-        self._ident_nr = str(identnr)
+        self._ident_nr = intern_identnr(identnr)
         self._adresse = int(adresse)
         self._persist = persist
         
@@ -185,7 +321,7 @@ class VdsAddressSensor(RestoreEntity, SensorEntity):
     @callback
     def _handle_event(self, event_type, data):
         """Handle events from VdS Hub."""
-        if str(data.get("identnr")) != self._ident_nr:
+        if data.get("identnr") != self._ident_nr:
             return
         
         if event_type == "alarm":
@@ -211,7 +347,7 @@ class VdsOutputSensor(RestoreEntity, SensorEntity):
 
     def __init__(self, hub, identnr, adresse, persist):
         self._hub = hub
-        self._ident_nr = str(identnr)
+        self._ident_nr = intern_identnr(identnr)
         self._adresse = int(adresse)
         self._persist = persist
         
@@ -241,7 +377,7 @@ class VdsOutputSensor(RestoreEntity, SensorEntity):
     @callback
     def _handle_event(self, event_type, data):
         """Handle events from VdS Hub."""
-        if str(data.get("identnr")) != self._ident_nr:
+        if data.get("identnr") != self._ident_nr:
             return
         
         if event_type == "alarm":
@@ -264,7 +400,7 @@ class VdsLastMessageSensor(RestoreEntity, SensorEntity):
 
     def __init__(self, hub, dev_conf, persist):
         self._hub = hub
-        self._ident_nr = str(dev_conf.get("identnr", "Unknown"))
+        self._ident_nr = intern_identnr(dev_conf.get("identnr", "Unknown"))
         self._persist = persist
         self._attr_unique_id = f"vds_last_msg_{self._ident_nr}"
         self._attr_name = f"Last Message"
@@ -294,7 +430,7 @@ class VdsLastMessageSensor(RestoreEntity, SensorEntity):
     @callback
     def _handle_event(self, event_type, data):
         """Handle events from VdS Hub."""
-        if str(data.get("identnr")) != str(self._ident_nr):
+        if data.get("identnr") != self._ident_nr:
             return
         
         if event_type in ["alarm", "status"]:
@@ -331,7 +467,7 @@ class VdsLastTestMessageSensor(RestoreEntity, SensorEntity):
 
     def __init__(self, hub, dev_conf, persist):
         self._hub = hub
-        self._ident_nr = dev_conf.get("identnr", "Unknown")
+        self._ident_nr = intern_identnr(dev_conf.get("identnr", "Unknown"))
         self._persist = persist
         self._attr_unique_id = f"vds_last_test_msg_{self._ident_nr}"
         self._attr_name = f"Last Test Message"
@@ -355,7 +491,7 @@ class VdsLastTestMessageSensor(RestoreEntity, SensorEntity):
     @callback
     def _handle_event(self, event_type, data):
         """Handle events from VdS Hub."""
-        if str(data.get("identnr")) != str(self._ident_nr):
+        if data.get("identnr") != self._ident_nr:
             return
 
         if event_type == "status" and "Testmeldung" in data.get("msg", ""):
@@ -373,7 +509,7 @@ class VdsManufacturerSensor(RestoreEntity, SensorEntity):
 
     def __init__(self, hub, dev_conf, persist):
         self._hub = hub
-        self._ident_nr = dev_conf.get("identnr", "Unknown")
+        self._ident_nr = intern_identnr(dev_conf.get("identnr", "Unknown"))
         self._persist = persist
         self._attr_unique_id = f"vds_manufacturer_{self._ident_nr}"
         self._attr_name = f"Manufacturer ID"
@@ -399,7 +535,7 @@ class VdsManufacturerSensor(RestoreEntity, SensorEntity):
     @callback
     def _handle_event(self, event_type, data):
         """Handle events from VdS Hub."""
-        if str(data.get("identnr")) != str(self._ident_nr):
+        if data.get("identnr") != self._ident_nr:
             return
 
         if event_type == "connected":
@@ -420,3 +556,93 @@ class VdsManufacturerSensor(RestoreEntity, SensorEntity):
             if features:
                 self._attr_extra_state_attributes.update(features)
                 self.async_write_ha_state()
+
+
+class VdsReceiverSensor(SensorEntity):
+    """Diagnostic sensor exposing one receiver-wide protocol metric."""
+
+    _attr_should_poll = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, hub, entry_id, key, name, icon, unit, state_class, value_fn):
+        self._hub = hub
+        self._key = key
+        self._value_fn = value_fn
+        self._attr_unique_id = f"vds_receiver_{entry_id}_{key}"
+        self._attr_name = name
+        self._attr_icon = icon
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, f"receiver_{entry_id}")},
+            "name": "VdS 2465 Receiver",
+            "manufacturer": "VdS 2465",
+            "model": "Server",
+        }
+
+    async def async_update(self):
+        """Read the current value from the hub metrics."""
+        metrics = self._hub.metrics
+        self._attr_native_value = self._value_fn(metrics)
+        if self._key == "frames_received":
+            self._attr_extra_state_attributes = {f"ik{ik}": n for ik, n in sorted(metrics.frames_rx.items())}
+        elif self._key == "frames_sent":
+            self._attr_extra_state_attributes = {f"ik{ik}": n for ik, n in sorted(metrics.frames_tx.items())}
+        elif self._key == "pending_outputs":
+            self._attr_extra_state_attributes = self._hub.server.pending_outputs.snapshot()
+
+
+class VdsLinkSensor(SensorEntity):
+    """Diagnostic sensor with one windowed protocol statistic of a VdS device."""
+
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, hub, dev_conf, key, name, icon, unit, value_fn):
+        self._hub = hub
+        self._ident_nr = intern_identnr(dev_conf.get("identnr", "Unknown"))
+        self._key = key
+        self._value_fn = value_fn
+        self._attr_unique_id = f"vds_{self._ident_nr}_link_{key}"
+        self._attr_name = name
+        self._attr_icon = icon
+        self._attr_native_unit_of_measurement = unit
+        self._attr_native_value = None
+        self._attr_extra_state_attributes = None
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, str(self._ident_nr))},
+            "name": f"VdS Device {self._ident_nr}",
+            "manufacturer": "VdS 2465",
+            "model": "Generic ID",
+        }
+
+    async def async_added_to_hass(self):
+        """Register callbacks and show the current window."""
+        self.async_on_remove(self._hub.add_listener(self._handle_event))
+        self._update_value()
+
+    def _update_value(self):
+        """Recompute value and attributes; True if either changed."""
+        window = self._hub.link_stats.get(self._ident_nr)
+        if window is None:
+            return False
+        now = time.monotonic()
+        value = self._value_fn(window.totals(now), window, now)
+        attributes = self._attr_extra_state_attributes
+        if self._key == "round_trip_time":
+            # Quantiles of the connection's streaming estimate, not limited to the window
+            attributes = {key: _ms(quantile) for key, quantile in window.rtt_quantiles.items()}
+        if value == self._attr_native_value and attributes == self._attr_extra_state_attributes:
+            return False
+        self._attr_native_value = value
+        self._attr_extra_state_attributes = attributes
+        return True
+
+    @callback
+    def _handle_event(self, event_type, data):
+        """Refresh on the periodic link_stats report of this device, write only changes."""
+        if data.get("identnr") != self._ident_nr:
+            return
+        if event_type in ("link_stats", "disconnected") and self._update_value():
+            self.async_write_ha_state()
@@ -1,9 +1,15 @@
+import functools
+import logging
 from homeassistant.components.switch import SwitchEntity, SwitchDeviceClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers import entity_registry as er
 from .const import DOMAIN, CONF_DEVICES, CONF_VDS_DEVICE, CONF_VDS_AREA, CONF_VDS_OUTPUTS
+from .vds_lib import intern_identnr
+
+_LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -14,19 +20,87 @@ async def async_setup_entry(
     hub = hass.data[DOMAIN][entry.entry_id]
     devices = entry.options.get(CONF_DEVICES, {})
 
-    entities = []
-    for dev_conf in devices.values():
+    # identnr -> {address: VdsOutputSwitch}
+    switches = {}
+
+    # Lazy mode: only switches that exist and are enabled in the entity registry
+    enabled_unique_ids = None
+    if hub.lazy:
+        entity_registry = er.async_get(hass)
+        enabled_unique_ids = {
+            ent.unique_id
+            for ent in er.async_entries_for_config_entry(entity_registry, entry.entry_id)
+            if ent.domain == "switch" and ent.disabled_by is None
+        }
+
+    def create_switches(dev_conf, first=1):
         identnr = dev_conf.get("identnr", "Unknown")
         vds_device = dev_conf.get(CONF_VDS_DEVICE, 1)
         vds_area = dev_conf.get(CONF_VDS_AREA, 1)
         # Get configured number of outputs (default 0)
         num_outputs = dev_conf.get(CONF_VDS_OUTPUTS, 0)
         
-        for i in range(1, num_outputs + 1):
-            entities.append(VdsOutputSwitch(hub, identnr, i, vds_device, vds_area))
+        created = []
+        for i in range(first, num_outputs + 1):
+            if enabled_unique_ids is not None and f"vds_output_{identnr}_{i}" not in enabled_unique_ids:
+                continue
+            switch = VdsOutputSwitch(hub, identnr, i, vds_device, vds_area)
+            switches.setdefault(str(identnr), {})[i] = switch
+            created.append(switch)
+        return created
+
+    entities = []
+    for dev_conf in devices.values():
+        entities.extend(create_switches(dev_conf))
 
     async_add_entities(entities)
 
+    @callback
+    def device_changed(old_conf, new_conf):
+        """Add or remove output switches for a device added/edited at runtime."""
+        if new_conf is None:
+            switches.pop(str(old_conf.get("identnr")), None)
+            return
+        if old_conf is None:
+            async_add_entities(create_switches(new_conf))
+            return
+
+        identnr = str(new_conf.get("identnr"))
+        old_outputs = old_conf.get(CONF_VDS_OUTPUTS, 0)
+        new_outputs = new_conf.get(CONF_VDS_OUTPUTS, 0)
+        known = switches.get(identnr, {})
+
+        # Keep existing switches (and their enabled state), just update Device/Area
+        for switch in known.values():
+            switch.set_target(new_conf.get(CONF_VDS_DEVICE, 1), new_conf.get(CONF_VDS_AREA, 1))
+
+        if new_outputs > old_outputs:
+            async_add_entities(create_switches(new_conf, first=old_outputs + 1))
+        elif new_outputs < old_outputs:
+            for i in range(new_outputs + 1, old_outputs + 1):
+                known.pop(i, None)
+            hub.remove_entities("switch", [f"vds_output_{identnr}_{i}" for i in range(new_outputs + 1, old_outputs + 1)])
+
+    entry.async_on_unload(hub.register_device_handler("switch", device_changed))
+
+    @callback
+    def materialize(identnr, address):
+        """Create (and enable) a single output switch on request."""
+        if address in switches.get(identnr, {}):
+            return
+        dev_conf = next((d for d in hub.devices_config if str(d.get("identnr")) == identnr), {})
+        switch = VdsOutputSwitch(hub, dev_conf.get("identnr", identnr), address,
+                                 dev_conf.get(CONF_VDS_DEVICE, 1), dev_conf.get(CONF_VDS_AREA, 1))
+        switch._attr_entity_registry_enabled_default = True
+        entity_registry = er.async_get(hass)
+        entity_id = entity_registry.async_get_entity_id("switch", DOMAIN, switch.unique_id)
+        if entity_id:
+            entity_registry.async_update_entity(entity_id, disabled_by=None)
+        switches.setdefault(identnr, {})[address] = switch
+        async_add_entities([switch])
+
+    entry.async_on_unload(hub.register_materializer("switch", materialize))
+
 
 class VdsOutputSwitch(SwitchEntity):
     """Switch representing a VdS output."""
@@ -38,7 +112,7 @@ class VdsOutputSwitch(SwitchEntity):
 
     def __init__(self, hub, identnr, address, device=1, area=1):
         self._hub = hub
-        self._ident_nr = identnr
+        self._ident_nr = intern_identnr(identnr)
         self._address = address
         
         # Configured Device/Area. 
@@ -61,19 +135,41 @@ class VdsOutputSwitch(SwitchEntity):
         """Register callbacks."""
         self.async_on_remove(self._hub.add_listener(self._handle_event))
 
+    def set_target(self, device, area):
+        """Update the configured Device/Area after the device was edited."""
+        self._device = device
+        self._area = area
+
     async def async_turn_on(self, **kwargs):
         """Turn the switch on."""
-        self._hub.send_output(self._ident_nr, self._address, True, device=self._device, area=self._area)
-        # Optimistically set state, but it will be confirmed by event if VdS acknowledges
-        self._attr_is_on = True
-        self.async_write_ha_state()
+        await self._switch(True)
 
     async def async_turn_off(self, **kwargs):
         """Turn the switch off."""
-        self._hub.send_output(self._ident_nr, self._address, False, device=self._device, area=self._area)
-        # Optimistically set state
-        self._attr_is_on = False
+        await self._switch(False)
+
+    async def _switch(self, state):
+        """Set the state optimistically and return; roll it back later if the device does not confirm it.
+
+        Scripts and automations do not wait for the feedback record, which
+        can take up to the offline queue TTL plus OUTPUT_CONFIRM_TIMEOUT.
+        """
+        previous = self._attr_is_on
+        future = self._hub.send_output(self._ident_nr, self._address, state, device=self._device, area=self._area)
+        self._attr_is_on = state
         self.async_write_ha_state()
+        # The feedback record itself updates the state in _handle_event
+        future.add_done_callback(functools.partial(self._switch_done, state, previous))
+
+    @callback
+    def _switch_done(self, state, previous, future):
+        """Roll back the optimistic state when the command failed."""
+        if future.cancelled() or future.exception() is None:
+            return
+        _LOGGER.warning(f"VdS {self._ident_nr} output {self._address}: {future.exception()}")
+        if self.hass is not None and self._attr_is_on == state:
+            self._attr_is_on = previous
+            self.async_write_ha_state()
 
     @callback
     def _handle_event(self, event_type, data):
@@ -2,11 +2,23 @@ import asyncio
 import struct
 import logging
 import binascii
+import collections
 import os
 import datetime
+import functools
+import ipaddress
+import re
+import socket
+import sys
+import time
+import zlib
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 
+from .const import DEFAULT_OFFLOAD_THRESHOLD, DEFAULT_RTO_MAX_MS, DEFAULT_RTO_MIN_MS
+from .metrics import LINK_COUNTERS, LatencyQuantiles, ReceiverMetrics
+from .rate_limit import FloodGuard
+
 _LOGGER = logging.getLogger(__name__)
 
 # --- KONSTANTEN ---
@@ -24,6 +36,10 @@ ACTION_RETRY = 11
 
 MIN_LENGTH = 48
 
+# Anzahl der zuletzt empfangenen Datenpakete (TC + Payload-Hash) pro Verbindung,
+# anhand derer Wiederholungen erkannt werden
+DUPLICATE_WINDOW = 32
+
 # Mapping der VdS Meldungsarten (Auszug)
 VDS_MESSAGES = {
     0: "Meldung - Ein",
@@ -171,25 +187,41 @@ VDS_TRANSPORT_SERVICES = {
     0x90: "TCP/IP-Intranet-Uebertragung"
 }
 
+# Vorkompilierte Codecs
+FRAME_HEAD = struct.Struct('>IHIBBB')  # TC, CRC, RC, IK, PK, L
+LINK_HEADER = struct.Struct('>HH')     # KeyNr, Länge
+CRC_FIELD = struct.Struct('>H')
+CRC_OFFSET = 4
+UINT32 = struct.Struct('>I')
+RC_IK_FIELD = struct.Struct('>IB') # ab Offset 6
+
+# Entschlüsselter Paketkopf; ein unpack_from pro Paket, von der IK-Auswertung gemeinsam genutzt
+FrameHeader = collections.namedtuple("FrameHeader", "tc crc rc ik pk length")
+
+def parse_header(data, _new=tuple.__new__, _unpack=FRAME_HEAD.unpack_from):
+    """FrameHeader aus den ersten 13 Bytes eines entschlüsselten Pakets."""
+    return _new(FrameHeader, _unpack(data))
+
+@functools.lru_cache(maxsize=64)
+def _word_codec(count):
+    return struct.Struct(f'>{count}H')
+
 def calculate_checksum_logic(data, check_mode=False):
-    crc = 0
-    original = 0
+    # Einerkomplement-Summe der 16-Bit-Wörter; die Summe ist assoziativ, daher
+    # genügt eine Gesamtsumme mit anschließender Rückführung der Überträge.
     length = len(data)
-    for pos in range(0, length, 2):
-        temp = data[pos] << 8
-        if pos + 1 == length:
-            temp |= 0x00
-        else:
-            temp |= data[pos + 1]
-        
-        if check_mode and pos == 4:
-            original = temp
-        else:
-            crc += temp
-            if crc > 65535:
-                crc &= 0xffff
-                crc += 1
-            
+    words = _word_codec(length // 2).unpack_from(data)
+    crc = sum(words)
+    if length & 1:
+        crc += data[-1] << 8
+
+    original = 0
+    if check_mode and length > 4:
+        original = words[2] if length >= 6 else data[4] << 8
+        crc -= original
+
+    while crc > 0xFFFF:
+        crc = (crc & 0xFFFF) + (crc >> 16)
     crc = ~crc & 0xffff
     return crc, original
 
@@ -201,17 +233,203 @@ def check_crc16(data):
         _LOGGER.debug(f"CRC Mismatch: Rec={original:04X} Calc={calculated:04X} Data={binascii.hexlify(data)}")
     return calculated == original
 
-def set_crc16(data):
-    crc, _ = calculate_checksum_logic(data, check_mode=True)
-    struct.pack_into('>H', data, 4, crc)
+def crc_update(old_crc, old_words, new_words):
+    """CRC nach Änderung einzelner 16-Bit-Wörter nachführen, ohne neu zu summieren.
+
+    old_words/new_words sind die alten und neuen Werte der geänderten Wörter
+    (big-endian, ohne das CRC-Feld). Die Einerkomplement-Summe entspricht der
+    Summe modulo 0xFFFF; das Ergebnis ist gleich calculate_checksum_logic,
+    außer wenn das neue Paket nur aus Nullen besteht.
+    """
+    total = ((~old_crc & 0xFFFF) - sum(old_words) + sum(new_words)) % 0xFFFF or 0xFFFF
+    return ~total & 0xFFFF
+
+def set_crc16(data, old_words=None, new_words=None):
+    """CRC setzen. Mit old_words/new_words wird die vorhandene CRC nur nachgeführt."""
+    if old_words is None:
+        crc, _ = calculate_checksum_logic(data, check_mode=True)
+    else:
+        crc = crc_update(CRC_FIELD.unpack_from(data, CRC_OFFSET)[0], old_words, new_words)
+    CRC_FIELD.pack_into(data, CRC_OFFSET, crc)
     return data
 
-def pad_data(data):
-    length = len(data)
-    diff = 16 - (length % 16)
-    if length + diff < MIN_LENGTH:
-        diff = MIN_LENGTH - length
-    return data + (b'\x00' * diff)
+def padded_length(length):
+    """Länge nach dem Auffüllen auf ganze AES-Blöcke, mindestens MIN_LENGTH."""
+    length += 16 - (length % 16)
+    return max(length, MIN_LENGTH)
+
+# Das Längenfeld L ist ein Byte
+MAX_PAYLOAD_LENGTH = 255
+MAX_FRAME_LENGTH = padded_length(FRAME_HEAD.size + MAX_PAYLOAD_LENGTH)
+# Paket ohne Nutzdaten (IK3 Poll, IK5/IK6)
+EMPTY_FRAME_LENGTH = padded_length(FRAME_HEAD.size)
+_ZERO_VIEW = memoryview(bytes(MAX_FRAME_LENGTH))
+_ZERO_IV = bytes(16)
+
+# Wie lange (s) eine Gegenstelle nach unbekannter KeyNr/Identnr sofort abgewiesen wird
+REJECT_CACHE_SECONDS = 60
+# Obergrenze für Einträge in Abweisungs-Cache und Verbindungsraten-Buckets
+ADMISSION_TABLE_SIZE = 4096
+
+# TCP-Keepalive: Anzahl unbeantworteter Proben bis zum Verbindungsabbruch
+KEEPALIVE_COUNT = 6
+# Höchstabstand (s) zwischen zwei Läufen des Leerlauf-Reapers
+REAPER_INTERVAL = 30
+# Sekunden zwischen zwei "link_stats"-Meldungen je Gerät (0 = aus)
+LINK_STATS_INTERVAL = 10
+# Wiederholungs-Timeout (RTO) nach RFC 6298 aus SRTT/RTTVAR, Grenzen in Sekunden; vor der
+# ersten Messung gilt polling_interval + 1. Jede Wiederholung verdoppelt das RTO.
+DEFAULT_RTO_MIN = DEFAULT_RTO_MIN_MS / 1000
+DEFAULT_RTO_MAX = DEFAULT_RTO_MAX_MS / 1000
+RTO_GRANULARITY = 0.01
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+# Schaltbefehle für nicht verbundene Geräte: Haltedauer (s) und Höchstzahl je Identnummer
+OUTPUT_QUEUE_TTL = 60
+OUTPUT_QUEUE_LIMIT = 64
+# Quantile der RTT in den link_stats-Meldungen
+RTT_QUANTILES = (0.5, 0.95, 0.99)
+# Indizes in VdSConnection.link_counts, Reihenfolge wie LINK_COUNTERS
+LINK_FRAMES, LINK_RETRANSMITS, LINK_CRC_ERRORS, LINK_RTT_SUM, LINK_RTT_COUNT = range(len(LINK_COUNTERS))
+
+# Ein Listen-Socket; max_connections 0 = unbegrenzt
+Listener = collections.namedtuple("Listener", "host port max_connections")
+
+_LISTENER_RE = re.compile(r"^(?:\[(?P<host6>[^\]]+)\]|(?P<host>[^:\s\[\]]+))(?::(?P<port>\d+))?(?::(?P<max>\d+))?$")
+
+def parse_listeners(value, default_port):
+    """Parse "0.0.0.0:4100, 10.8.0.1:4101:50, [::]:4102" into Listener tuples.
+
+    Port defaults to default_port, the optional third field is the connection
+    limit. An empty value listens on 0.0.0.0:default_port. Raises ValueError.
+    """
+    listeners = []
+    for part in str(value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = _LISTENER_RE.match(part)
+        if match is None:
+            raise ValueError(f"Invalid listener {part}")
+        port = int(match.group("port") or default_port)
+        if not 1 <= port <= 65535:
+            raise ValueError(f"Invalid port in {part}")
+        listener = Listener(match.group("host6") or match.group("host"), port, int(match.group("max") or 0))
+        if any((l.host, l.port) == (listener.host, listener.port) for l in listeners):
+            raise ValueError(f"Duplicate listener {part}")
+        listeners.append(listener)
+    return listeners or [Listener("0.0.0.0", int(default_port), 0)]
+
+def parse_networks(value):
+    """Parse "10.0.0.5, 192.168.1.0/24" into a tuple of ip_network. Raises ValueError."""
+    return tuple(
+        ipaddress.ip_network(part.strip(), strict=False)
+        for part in str(value or "").split(",") if part.strip()
+    )
+
+@functools.lru_cache(maxsize=256)
+def cipher_for(key_hex):
+    """AES-CBC mit Null-IV; das Cipher-Objekt wird je Schlüssel nur einmal angelegt."""
+    return Cipher(algorithms.AES(binascii.unhexlify(key_hex)), modes.CBC(_ZERO_IV), backend=default_backend())
+
+def aes_decrypt(key_hex, data):
+    decryptor = cipher_for(key_hex).decryptor()
+    return decryptor.update(data) + decryptor.finalize()
+
+def decode_frame(key_hex, data):
+    """Entschlüsselt (falls Schlüssel) und prüft die CRC eines Pakets. Threadsicher."""
+    if key_hex:
+        data = aes_decrypt(key_hex, data)
+    return data, check_crc16(data)
+
+def decode_frames(jobs):
+    """decode_frame für eine Liste von (key_hex, data), Reihenfolge bleibt erhalten."""
+    return [decode_frame(key_hex, data) for key_hex, data in jobs]
+
+class FrameBuilder:
+    """Baut Sendepakete in einem wiederverwendeten Puffer (Verbindungskopf + Klartext).
+
+    Pro Paket entsteht nur das fertige bytes-Objekt, bei verschlüsselten
+    Paketen zusätzlich der Chiffretext. Der AES-Kontext wird je Paket aus dem
+    gecachten Cipher-Objekt erzeugt und hält keinen Zustand über Pakete hinweg.
+    Unverschlüsselte Pakete ohne Nutzdaten (vor allem Polls) entstehen aus dem
+    zuletzt gebauten leeren Paket im Puffer, in dem nur TC, RC und IK ersetzt
+    werden; die CRC wird dabei mit crc_update aus der alten CRC nachgeführt.
+    Nicht threadsicher; die Verbindung serialisiert über ihren Sende-Lock.
+    """
+
+    __slots__ = ("buffer", "empty_words")
+
+    def __init__(self):
+        self.buffer = bytearray(LINK_HEADER.size + MAX_FRAME_LENGTH)
+        # Veränderliche Wörter (TC, RC, IK/PK) des leeren Pakets im Puffer, None = Puffer hält ein anderes Paket
+        self.empty_words = None
+
+    def build(self, key_nr, key_hex, tc, rc, ik, payload=b""):
+        encrypted = key_nr > 0 and key_hex
+        if not payload and not encrypted:
+            return self.build_empty(key_nr, tc, rc, ik)
+        self.empty_words = None
+        length = FRAME_HEAD.size + len(payload)
+        padded = padded_length(length)
+        end = LINK_HEADER.size + padded
+        buffer = self.buffer
+        LINK_HEADER.pack_into(buffer, 0, key_nr, padded)
+        FRAME_HEAD.pack_into(buffer, LINK_HEADER.size, tc, 0, rc, ik, 1, len(payload))
+        buffer[LINK_HEADER.size + FRAME_HEAD.size:LINK_HEADER.size + length] = payload
+        buffer[LINK_HEADER.size + length:end] = _ZERO_VIEW[:padded - length]
+        view = memoryview(buffer)
+        frame = view[LINK_HEADER.size:end]
+        set_crc16(frame)
+        if encrypted:
+            return bytes(view[:LINK_HEADER.size]) + cipher_for(key_hex).encryptor().update(frame)
+        return bytes(view[:end])
+
+    def build_empty(self, key_nr, tc, rc, ik):
+        """Unverschlüsseltes Paket ohne Nutzdaten, CRC aus dem vorigen leeren Paket nachgeführt."""
+        words = (tc >> 16, tc & 0xFFFF, rc >> 16, rc & 0xFFFF, ik << 8 | 1)
+        base = LINK_HEADER.size
+        end = base + EMPTY_FRAME_LENGTH
+        buffer = self.buffer
+        # KeyNr steht nur im Verbindungskopf und geht nicht in die CRC ein
+        LINK_HEADER.pack_into(buffer, 0, key_nr, EMPTY_FRAME_LENGTH)
+        if self.empty_words is None:
+            FRAME_HEAD.pack_into(buffer, base, tc, 0, rc, ik, 1, 0)
+            buffer[base + FRAME_HEAD.size:end] = _ZERO_VIEW[:EMPTY_FRAME_LENGTH - FRAME_HEAD.size]
+            set_crc16(memoryview(buffer)[base:end])
+        else:
+            old_crc = CRC_FIELD.unpack_from(buffer, base + CRC_OFFSET)[0]
+            UINT32.pack_into(buffer, base, tc)
+            RC_IK_FIELD.pack_into(buffer, base + 6, rc, ik)
+            # PK = 1, das Paket besteht also nie nur aus Nullen
+            CRC_FIELD.pack_into(buffer, base + CRC_OFFSET, crc_update(old_crc, self.empty_words, words))
+        self.empty_words = words
+        return bytes(buffer[:end])
+
+def peer_address(peername):
+    """ip_address aus get_extra_info('peername'), None wenn unbekannt."""
+    try:
+        return ipaddress.ip_address(peername[0])
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def set_keepalive(sock, idle, interval, user_timeout=0):
+    """TCP-Keepalive (und TCP_USER_TIMEOUT) setzen, soweit die Plattform es kann."""
+    if sock is None:
+        return
+    try:
+        if idle > 0:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle)
+            if hasattr(socket, "TCP_KEEPINTVL") and interval > 0:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval)
+            if hasattr(socket, "TCP_KEEPCNT"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+        if user_timeout > 0 and hasattr(socket, "TCP_USER_TIMEOUT"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, int(user_timeout * 1000))
+    except OSError as e:
+        _LOGGER.debug(f"Keepalive-Optionen konnten nicht gesetzt werden: {e}")
 
 def get_time_buffer():
     now = datetime.datetime.now()
@@ -228,14 +446,178 @@ def get_time_buffer():
     buf[8] = now.second
     return buf
 
+def output_record(address, state, device=1, area=1):
+    # Satz 02: [Len(5), Typ(0x02), Gerät/Bereich, Adresse, 0x00, Adresserweiterung 2 = Ausgang, Zustand]
+    record = bytearray(7)
+    record[0] = 5; record[1] = 0x02
+    record[2] = ((device << 4) & 0xF0) | (area & 0x0F)
+    record[3] = address & 0xFF
+    record[4] = 0x00; record[5] = 0x02
+    record[6] = 0x00 if state else 0x80
+    return record
+
+
+# BCD-Identnummer: je Byte erst das untere, dann das obere Halbbyte, 0xF = Füllziffer
+_BCD_DIGITS = tuple(
+    (str(b & 0x0F) if b & 0x0F != 0xF else "") + (str(b >> 4) if b >> 4 != 0xF else "")
+    for b in range(256)
+)
+
+def intern_identnr(value):
+    """identnr als internierter str, so trifft jeder spätere Vergleich den Identitätspfad."""
+    return sys.intern(str(value))
+
+def decode_ident(data):
+    return intern_identnr("".join([_BCD_DIGITS[b] for b in data]))
+
+
+class DeviceIndex:
+    """Read-only lookup tables over the configured devices.
+
+    The server swaps the whole index at once on reconfiguration, so a
+    connection never sees a half-updated device list.
+    """
+
+    def __init__(self, devices):
+        self.devices = tuple(devices) # [{key: "...", identnr: "...", keynr: ...}, ...]
+        self.by_ident = {}
+        self.by_keynr = {}
+        self.networks = {} # identnr -> erlaubte Quellnetze, fehlt = keine Einschränkung
+        for dev in self.devices:
+            ident = intern_identnr(dev.get('identnr'))
+            self.by_ident.setdefault(ident, dev)
+            self.by_keynr.setdefault(int(dev.get('keynr', 0)), dev)
+            try:
+                networks = parse_networks(dev.get('allowed_ips', ''))
+            except ValueError:
+                _LOGGER.error(f"Ungültige erlaubte Adressen für Gerät {ident}, keine Einschränkung")
+                networks = ()
+            if networks:
+                self.networks[ident] = networks
+        # Erst wenn jedes Gerät eine Liste hat, lässt sich schon beim Accept filtern
+        self.restricted = bool(self.devices) and all(
+            str(dev.get('identnr')) in self.networks for dev in self.devices
+        )
+
+    def peer_allowed(self, ip):
+        """Vorabprüfung vor dem Handshake: passt die Adresse zu irgendeinem Gerät?"""
+        if not self.restricted:
+            return True
+        return any(ip in net for networks in self.networks.values() for net in networks)
+
+    def source_listed(self, ip):
+        """Steht die Adresse in der Freigabeliste irgendeines Geräts?"""
+        return any(ip in net for networks in self.networks.values() for net in networks)
+
+    def device_allowed(self, dev, ip):
+        networks = self.networks.get(str(dev.get('identnr')))
+        if not networks or ip is None:
+            return True
+        return any(ip in net for net in networks)
+
+
+def same_credentials(old, new):
+    """True if two device configs use the same KeyNr and key."""
+    return (
+        int(old.get('keynr', 0)) == int(new.get('keynr', 0))
+        and old.get('key', '') == new.get('key', '')
+        and old.get('encrypted', True) == new.get('encrypted', True)
+    )
+
+
+class PendingCommands:
+    """Output commands (address, state, device, area) for devices that are not connected.
+
+    Bounded per identnr (the oldest command is dropped) and expired after
+    `ttl` seconds; the server hands them to the connection once the
+    device has identified itself.
+    """
+
+    def __init__(self, ttl=OUTPUT_QUEUE_TTL, limit=OUTPUT_QUEUE_LIMIT, metrics=None):
+        self.ttl = ttl
+        self.limit = limit
+        self.metrics = metrics
+        self._queues = {} # identnr -> deque[(queued_at, command)]
+
+    def add(self, identnr, commands, now=None):
+        if now is None:
+            now = time.monotonic()
+        queue = self._queues.get(identnr)
+        if queue is None:
+            queue = self._queues[identnr] = collections.deque(maxlen=self.limit)
+        for command in commands:
+            if len(queue) == self.limit:
+                _LOGGER.warning(f"Warteschlange für {identnr} voll, ältester Schaltbefehl verworfen")
+                self._dropped(1)
+            queue.append((now, tuple(command)))
+
+    def take(self, identnr, now=None):
+        """Noch gültige Befehle eines Geräts entnehmen, in Eingangsreihenfolge."""
+        queue = self._queues.pop(identnr, None)
+        if not queue:
+            return []
+        if now is None:
+            now = time.monotonic()
+        commands = [command for queued_at, command in queue if now - queued_at < self.ttl]
+        self._dropped(len(queue) - len(commands))
+        return commands
+
+    def prune(self, now=None):
+        """Abgelaufene Befehle verwerfen; liefert deren Anzahl."""
+        if now is None:
+            now = time.monotonic()
+        expired = 0
+        for identnr in list(self._queues):
+            queue = self._queues[identnr]
+            while queue and now - queue[0][0] >= self.ttl:
+                queue.popleft()
+                expired += 1
+            if not queue:
+                del self._queues[identnr]
+        self._dropped(expired)
+        return expired
+
+    def snapshot(self, now=None):
+        """identnr -> [{adresse, zustand, geraet, bereich, age}] für die Diagnose."""
+        if now is None:
+            now = time.monotonic()
+        self.prune(now)
+        return {
+            identnr: [
+                {"adresse": address, "zustand": bool(state), "geraet": device, "bereich": area,
+                 "age": round(now - queued_at, 1)}
+                for queued_at, (address, state, device, area) in queue
+            ]
+            for identnr, queue in self._queues.items()
+        }
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _dropped(self, count):
+        if count and self.metrics is not None:
+            self.metrics.inc("expired_output_commands", count)
+
 
 class VdSConnection:
-    def __init__(self, reader, writer, devices_config, event_callback, polling_interval=5):
+    # Kein __dict__ pro Verbindung; Gerätedaten liegen nur einmal im DeviceIndex des Servers
+    __slots__ = (
+        "reader", "writer", "peer", "peer_ip", "server", "event_callback",
+        "tc", "rc_rec", "tc_rec", "send_counter", "last_send_buffer",
+        "device_config", "key_nr_rec", "identnr", "buffer", "timer_handle", "poll_handle",
+        "polling_interval", "offload_threshold", "vds_request_counter", "last_sent_rc",
+        "send_queue", "_running", "last_valid_rx", "_tx_lock", "_seen_frames", "metrics", "_rx_time",
+        "link_counts", "sent_at", "rtt", "srtt", "rttvar", "listener",
+    )
+
+    def __init__(self, reader, writer, server, listener=None):
         self.reader = reader
         self.writer = writer
         self.peer = writer.get_extra_info('peername')
-        self.devices_config = devices_config # List of dicts: [{key: "...", identnr: "...", keynr: ...}, ...]
-        self.event_callback = event_callback # Funktion(event_type, data)
+        self.peer_ip = peer_address(self.peer)
+        self.server = server # Gerätekonfiguration (server.index), Callback und Intervall kommen vom Server
+        self.listener = listener
+        self.event_callback = server.event_callback # Funktion(event_type, data)
         
         self.tc = int.from_bytes(os.urandom(4), 'big')
         self.rc_rec = 0
@@ -248,15 +630,34 @@ class VdSConnection:
         self.key_nr_rec = 0
         self.identnr = None
         
-        self.buffer = b""
-        self.timer_task = None
-        self.poll_task = None
-        self.polling_interval = polling_interval
+        self.buffer = bytearray() # Empfangspuffer, wird in place erweitert und gekürzt
+        self.timer_handle = None
+        self.poll_handle = None
+        self.polling_interval = server.polling_interval
+        self.offload_threshold = server.offload_threshold
         self.vds_request_counter = 0
         
         self.last_sent_rc = 0
         self.send_queue = []
         self._running = True
+        # Zeitpunkt des letzten gültigen Pakets (bzw. des Verbindungsaufbaus), für den Reaper
+        self.last_valid_rx = time.monotonic()
+        # Hält die Sendereihenfolge ein, während ein großes Paket im Executor kodiert wird
+        self._tx_lock = asyncio.Lock()
+
+        # Duplikaterkennung: (TC, Payload-CRC32) -> Quittungssätze der Erstverarbeitung
+        self._seen_frames = {} # Einfügereihenfolge = Alter
+        self.metrics = server.metrics
+        # Empfangszeitpunkt des zuletzt verarbeiteten Pakets, bis die Antwort rausgeht
+        self._rx_time = None
+        # Gerätestatistik seit der letzten link_stats-Meldung
+        self.link_counts = [0] * len(LINK_COUNTERS)
+        # Sendezeit des letzten Pakets, bis die passende Antwort kommt; RTT-Verteilung der Verbindung,
+        # angelegt mit der ersten Messung
+        self.sent_at = None
+        self.rtt = None
+        self.srtt = None # geglättete RTT, None bis zur ersten Messung
+        self.rttvar = 0.0
 
     async def run(self):
         _LOGGER.info(f"Verbindung von {self.peer}")
@@ -276,6 +677,7 @@ class VdSConnection:
             _LOGGER.error(f"Fehler in Verbindung {self.peer}: {e}", exc_info=True)
         finally:
             await self.disconnect()
+            self.server.connection_closed(self)
 
     async def disconnect(self):
         if not self._running:
@@ -285,12 +687,14 @@ class VdSConnection:
         _LOGGER.info(f"Trenne Verbindung zu {self.peer}")
         if (self.identnr or self.key_nr_rec) and self.event_callback:
              try:
+                if self.identnr and self.server.link_stats_interval > 0:
+                    self.event_callback("link_stats", self.take_link_stats())
                 self.event_callback("disconnected", {"identnr": self.identnr, "keynr": self.key_nr_rec})
              except Exception as e:
                 _LOGGER.error(f"Error in disconnect callback: {e}")
 
-        if self.timer_task: self.timer_task.cancel()
-        if self.poll_task: self.poll_task.cancel()
+        if self.timer_handle: self.timer_handle.cancel()
+        if self.poll_handle: self.poll_handle.cancel()
         
         try:
             self.writer.close()
@@ -305,6 +709,9 @@ class VdSConnection:
 
     async def send(self, data):
         self.last_send_buffer = data
+        if self._rx_time is not None:
+            self.metrics.observe("rx_to_ack_seconds", time.monotonic() - self._rx_time)
+            self._rx_time = None
         _LOGGER.debug(f"TX ({self.peer}): {binascii.hexlify(data).upper()}")
         try:
             self.writer.write(data)
@@ -314,107 +721,63 @@ class VdSConnection:
              await self.disconnect()
 
     def get_device_by_keynr(self, keynr):
-        for dev in self.devices_config:
-            if int(dev.get('keynr', 0)) == keynr:
-                return dev
-        return None
+        return self.server.index.by_keynr.get(keynr)
 
-    def encrypt(self, data):
-        if not self.device_config or not self.device_config.get('key'):
-            return data
-        
-        key_hex = self.device_config['key']
-        key = binascii.unhexlify(key_hex)
-        iv = b'\x00' * 16
-        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
-
-    def decrypt(self, data):
-        if not self.device_config or not self.device_config.get('key'):
-            return data
-            
-        key_hex = self.device_config['key']
-        key = binascii.unhexlify(key_hex)
-        iv = b'\x00' * 16
-        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-        decryptor = cipher.decryptor()
-        return decryptor.update(data) + decryptor.finalize()
-
-    def prepare_packet(self, payload):
-        payload = pad_data(payload)
-        payload = bytearray(payload)
-        set_crc16(payload)
-        payload = bytes(payload)
-        
-        if self.key_nr_rec > 0:
-            payload = self.encrypt(payload)
-            
-        sl = len(payload)
-        header = struct.pack('>HH', self.key_nr_rec, sl)
-        return header + payload
+    def admit_device(self, dev):
+        """Per-device source address allowlist, checked once the device is known."""
+        if self.server.index.device_allowed(dev, self.peer_ip):
+            return True
+        _LOGGER.warning(f"Gerät {dev.get('identnr')} von nicht erlaubter Adresse {self.peer} abgewiesen")
+        self.metrics.inc("rejected_connections")
+        return False
+
+    def key_hex(self):
+        if not self.device_config:
+            return None
+        return self.device_config.get('key') or None
+
+    def offloaded(self, size):
+        return bool(self.offload_threshold) and size >= self.offload_threshold
+
+    async def run_codec(self, size, func, *args):
+        """Run an encode/decode step inline, or in the executor for large frames."""
+        if self.offloaded(size):
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+        return func(*args)
+
+    async def send_frame(self, ik, rc, payload=b""):
+        """Build and send one frame; frames leave in the order send_frame was called."""
+        tc = self.tc
+        self.tc = (self.tc + 1) & 0xFFFFFFFF
+        self.last_sent_rc = rc
+        self.metrics.frames_tx[ik] += 1
+        size = FRAME_HEAD.size + len(payload)
+        # Auf der Event-Loop teilen sich alle Verbindungen den Puffer des Servers, im Executor baut jeder Aufruf selbst
+        builder = FrameBuilder() if self.offloaded(size) else self.server.frame_builder
+        async with self._tx_lock:
+            packet = await self.run_codec(size, builder.build, self.key_nr_rec, self.key_hex(), tc, rc, ik, payload)
+            await self.send(packet)
+            self.sent_at = time.monotonic()
 
     async def send_ik1(self):
         _LOGGER.debug(f"Sende IK1 (Verbindungsaufbau) an {self.peer}")
-        buf = bytearray(14)
-        struct.pack_into('>I', buf, 0, self.tc)
-        self.tc = (self.tc + 1) & 0xFFFFFFFF
-        struct.pack_into('>I', buf, 6, 0)
-        self.last_sent_rc = 0
-        buf[10] = 1 # IK
-        buf[11] = 1 # PK
-        buf[12] = 1 # L
-        buf[13] = 1 # Window
-        await self.send(self.prepare_packet(buf))
+        await self.send_frame(1, 0, b"\x01") # Window = 1
 
     async def send_ik3(self):
         _LOGGER.debug(f"Sende IK3 (Poll) an {self.peer}")
-        buf = bytearray(13)
-        struct.pack_into('>I', buf, 0, self.tc)
-        self.tc = (self.tc + 1) & 0xFFFFFFFF
-        rc = (self.tc_rec + 1) & 0xFFFFFFFF
-        struct.pack_into('>I', buf, 6, rc)
-        self.last_sent_rc = rc
-        buf[10] = 3 # IK
-        buf[11] = 1 # PK
-        buf[12] = 0 # L
-        await self.send(self.prepare_packet(buf))
+        await self.send_frame(3, (self.tc_rec + 1) & 0xFFFFFFFF)
 
     async def send_ik4(self, payload):
         _LOGGER.debug(f"Sende IK4 (Daten) an {self.peer}, Payload-Länge: {len(payload)}")
-        l_byte = len(payload)
-        buf = bytearray(13)
-        struct.pack_into('>I', buf, 0, self.tc)
-        self.tc = (self.tc + 1) & 0xFFFFFFFF
-        rc = (self.tc_rec + 1) & 0xFFFFFFFF
-        struct.pack_into('>I', buf, 6, rc)
-        self.last_sent_rc = rc
-        buf[10] = 4 # IK
-        buf[11] = 1 # PK
-        buf[12] = l_byte # L
-        await self.send(self.prepare_packet(buf + payload))
+        await self.send_frame(4, (self.tc_rec + 1) & 0xFFFFFFFF, payload)
 
     async def send_ik5(self):
         _LOGGER.debug(f"Sende IK5 (Ack) an {self.peer}")
-        buf = bytearray(13)
-        struct.pack_into('>I', buf, 0, self.tc)
-        self.tc = (self.tc + 1) & 0xFFFFFFFF
-        rc = (self.tc_rec + 1) & 0xFFFFFFFF
-        struct.pack_into('>I', buf, 6, rc)
-        self.last_sent_rc = rc
-        buf[10] = 5; buf[11] = 1; buf[12] = 0
-        await self.send(self.prepare_packet(buf))
+        await self.send_frame(5, (self.tc_rec + 1) & 0xFFFFFFFF)
 
     async def send_ik6(self):
         _LOGGER.debug(f"Sende IK6 (Nak) an {self.peer}")
-        buf = bytearray(13)
-        struct.pack_into('>I', buf, 0, self.tc)
-        self.tc = (self.tc + 1) & 0xFFFFFFFF
-        rc = (self.tc_rec + 1) & 0xFFFFFFFF
-        struct.pack_into('>I', buf, 6, rc)
-        self.last_sent_rc = rc
-        buf[10] = 6; buf[11] = 1; buf[12] = 0
-        await self.send(self.prepare_packet(buf))
+        await self.send_frame(6, (self.tc_rec + 1) & 0xFFFFFFFF)
 
     async def controller(self, action):
         if not self._running: return
@@ -424,36 +787,66 @@ class VdSConnection:
             self.reset_timer()
             
         elif action == ACTION_DATA:
+            # Alle vollständigen Pakete abtrennen; ein Rückstau (mehrere Pakete pro read)
+            # wird gemeinsam dekodiert und danach der Reihe nach verarbeitet
+            frames = []
             while len(self.buffer) >= 4:
-                key_nr = struct.unpack('>H', self.buffer[0:2])[0]
-                sl = struct.unpack('>H', self.buffer[2:4])[0]
+                key_nr, sl = LINK_HEADER.unpack_from(self.buffer)
                 
-                total_len = 4 + sl
+                total_len = LINK_HEADER.size + sl
                 if len(self.buffer) < total_len:
                     break # Warten auf restliche Daten
                 
-                packet_data = self.buffer[4:total_len]
+                packet_data = bytes(self.buffer[LINK_HEADER.size:total_len])
                 _LOGGER.debug(f"RX Header ({self.peer}): KeyNr={key_nr}, Len={sl}")
                 
-                self.buffer = self.buffer[total_len:]
+                del self.buffer[:total_len]
+                dev = self.get_device_by_keynr(key_nr) if key_nr > 0 else None
+                frames.append((key_nr, dev, packet_data))
+                if key_nr > 0 and dev is None:
+                    break # Verbindung wird getrennt, der Rest ist hinfällig
+
+            if not frames:
+                return
+
+            rx_time = time.monotonic()
+            jobs = [((dev.get('key') or None) if dev else None, packet_data) for _, dev, packet_data in frames]
+            decoded = await self.run_codec(sum(len(packet_data) for _, _, packet_data in frames), decode_frames, jobs)
+            decrypt_time = (time.monotonic() - rx_time) / len(frames)
+
+            for (key_nr, dev, _), (decrypted, crc_ok) in zip(frames, decoded):
+                if not self._running:
+                    return
                 self.key_nr_rec = key_nr
                 
                 if key_nr > 0:
-                    dev = self.get_device_by_keynr(key_nr)
                     if dev:
+                        if not self.admit_device(dev):
+                            await self.disconnect()
+                            return
                         _LOGGER.debug(f"Entschlüssele Paket mit KeyNr {key_nr}")
                         self.device_config = dev
-                        decrypted = self.decrypt(packet_data)
+                        self.metrics.observe("decrypt_seconds", decrypt_time)
                     else:
                         _LOGGER.warning(f"Unbekannte KeyNr {key_nr} von {self.peer}")
+                        self.metrics.inc("unknown_keynr")
+                        self.server.remember_reject(self.peer_ip)
                         await self.disconnect()
                         return
                 else:
                     self.device_config = None
-                    decrypted = packet_data
-                    
-                if self.process_packet(decrypted):
-                    if self.timer_task: self.timer_task.cancel()
+                
+                parse_start = time.monotonic()
+                processed = self.process_packet(decrypted, crc_ok)
+                self.metrics.observe("parse_seconds", time.monotonic() - parse_start)
+                if processed:
+                    self._rx_time = rx_time
+                    self.last_valid_rx = rx_time
+                    self.link_counts[LINK_FRAMES] += 1
+                    # Antwort auf unser letztes Paket: die Gegenstelle sendet den TC, den wir als RC erwarten
+                    if self.sent_at is not None and self.tc_rec == self.last_sent_rc:
+                        self.observe_rtt(rx_time - self.sent_at)
+                    if self.timer_handle: self.timer_handle.cancel()
 
         elif action == ACTION_IK3:
             await self.send_ik3()
@@ -476,14 +869,16 @@ class VdSConnection:
             await self.controller(ACTION_IK3)
 
         elif action == ACTION_IK3_AFTER_POLL:
-            if self.poll_task: self.poll_task.cancel()
+            if self.poll_handle: self.poll_handle.cancel()
             
             if self.vds_request_counter > 0:
                 _LOGGER.debug(f"Burst Mode: {self.vds_request_counter} verbleibend")
                 await self.send_ik3()
                 self.vds_request_counter -= 1
             else:
-                self.poll_task = asyncio.create_task(self.wait_and_poll())
+                # Keine sofortige Antwort, der nächste Poll ist keine Quittung
+                self._rx_time = None
+                self.schedule_poll()
 
         elif action == ACTION_TIMER_EXPIRED:
             self.send_counter += 1
@@ -492,39 +887,75 @@ class VdSConnection:
                 _LOGGER.warning(f"Timeout nach 3 Wiederholungen ({self.peer})")
                 await self.disconnect()
                 return
+            # Antwort auf eine Wiederholung ist nicht eindeutig zuzuordnen, keine RTT (Karn)
+            self.sent_at = None
             if self.last_send_buffer:
+                self.metrics.inc("retransmits")
+                self.link_counts[LINK_RETRANSMITS] += 1
                 await self.send(self.last_send_buffer)
             self.reset_timer()
 
-    async def wait_and_poll(self):
+    # Timer laufen als loop.call_later-Handles statt als schlafende Tasks;
+    # ein Task entsteht erst, wenn der Timer tatsächlich abläuft.
+    def fire(self, action):
+        if self._running:
+            asyncio.create_task(self.controller(action))
+
+    def schedule_poll(self):
         if self.device_config and not self.device_config.get("stehend", True):
             return
-        await asyncio.sleep(self.polling_interval)
-        await self.controller(ACTION_IK3)
+        self.poll_handle = asyncio.get_running_loop().call_later(self.polling_interval, self.fire, ACTION_IK3)
 
     def reset_timer(self):
-        if self.timer_task: self.timer_task.cancel()
-        self.timer_task = asyncio.create_task(self.timer_expired())
+        if self.timer_handle: self.timer_handle.cancel()
+        self.timer_handle = asyncio.get_running_loop().call_later(
+            self.retransmit_timeout(), self.fire, ACTION_TIMER_EXPIRED
+        )
 
-    async def timer_expired(self):
-        await asyncio.sleep(self.polling_interval + 1)
-        await self.controller(ACTION_TIMER_EXPIRED)
+    def retransmit_timeout(self):
+        """RTO = SRTT + max(G, 4 * RTTVAR) in den Grenzen des Servers, verdoppelt je Wiederholung."""
+        if self.srtt is None:
+            rto = self.polling_interval + 1
+        else:
+            rto = self.srtt + max(RTO_GRANULARITY, 4 * self.rttvar)
+        rto = max(self.server.rto_min, rto) * (2 ** self.send_counter)
+        return min(self.server.rto_max, rto)
 
-    def process_packet(self, data):
-        if not check_crc16(data):
+    def observe_rtt(self, rtt):
+        self.sent_at = None
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+        if self.rtt is None:
+            self.rtt = LatencyQuantiles()
+        self.rtt.observe(rtt)
+        self.metrics.observe("round_trip_seconds", rtt)
+        self.link_counts[LINK_RTT_SUM] += rtt
+        self.link_counts[LINK_RTT_COUNT] += 1
+
+    def process_packet(self, data, crc_ok=None):
+        if crc_ok is None:
+            crc_ok = check_crc16(data)
+        if not crc_ok:
             _LOGGER.warning(f"CRC Fehler im Paket von {self.peer}")
+            self.metrics.inc("crc_errors")
+            self.link_counts[LINK_CRC_ERRORS] += 1
             return False
             
-        offset = 0
-        self.tc_rec = struct.unpack('>I', data[0:4])[0]
-        offset += 6 # + CRC
-        self.rc_rec = struct.unpack('>I', data[6:10])[0]
-        offset += 4
-        
-        ik = data[10]; pk = data[11]; l = data[12]
-        offset += 3
+        if len(data) < FRAME_HEAD.size:
+            _LOGGER.warning(f"Paket von {self.peer} zu kurz ({len(data)} Bytes)")
+            return False
+
+        header = parse_header(data)
+        self.tc_rec = header.tc
+        self.rc_rec = header.rc
+        ik = header.ik; pk = header.pk
+        self.metrics.frames_rx[ik] += 1
         
-        _LOGGER.debug(f"RX Parsed ({self.peer}): TC={self.tc_rec:08X}, RC={self.rc_rec:08X}, IK={ik}, PK={pk}, L={l}")
+        _LOGGER.debug(f"RX Parsed ({self.peer}): {header}")
         
         if pk != 1:
             _LOGGER.warning(f"Ungültige PK {pk} von {self.peer}")
@@ -554,9 +985,24 @@ class VdSConnection:
                 asyncio.create_task(self.controller(ACTION_IK3_AFTER_POLL))
             return True
         elif ik == 4:
-            payload = data[offset:offset+l]
+            payload = data[FRAME_HEAD.size:FRAME_HEAD.size + header.length]
             _LOGGER.debug(f"RX Payload ({self.peer}): {binascii.hexlify(payload).upper()}")
-            self.parse_vds_payload(payload)
+            frame_key = (self.tc_rec, zlib.crc32(payload))
+            acks = self._seen_frames.get(frame_key)
+            if acks is not None:
+                # Wiederholung (unsere Quittung ging verloren): erneut quittieren, aber nicht erneut melden
+                self.metrics.inc("duplicate_frames")
+                _LOGGER.debug(f"Wiederholtes Paket TC={self.tc_rec:08X} von {self.peer} wird nur quittiert")
+                self._seen_frames[frame_key] = self._seen_frames.pop(frame_key)
+                for ack in acks:
+                    if ack not in self.send_queue:
+                        self.send_queue.append(ack)
+            else:
+                queued = len(self.send_queue)
+                self.parse_vds_payload(payload)
+                self.remember_frame(frame_key, self.send_queue[queued:])
+                # Erst nach remember_frame: Schaltbefehle dürfen bei Wiederholungen nicht erneut gesendet werden
+                self.flush_pending_outputs()
             if self.send_queue:
                 asyncio.create_task(self.controller(ACTION_IK4))
             else:
@@ -569,13 +1015,35 @@ class VdSConnection:
                 self.tc_rec = expected_tc
             
             self.vds_request_counter = 5
-            if self.poll_task: self.poll_task.cancel()
+            if self.poll_handle: self.poll_handle.cancel()
             asyncio.create_task(self.send_ik3())
             return True
             
         asyncio.create_task(self.controller(ACTION_IK5))
         return True
 
+    def take_link_stats(self):
+        """Zähler seit dem letzten Aufruf als link_stats-Ereignisdaten, danach zurücksetzen."""
+        data = {"identnr": self.identnr, "queue_depth": len(self.send_queue), **dict(zip(LINK_COUNTERS, self.link_counts))}
+        for q in RTT_QUANTILES:
+            data[f"rtt_p{round(q * 100)}"] = self.rtt.quantile(q) if self.rtt is not None else None
+        self.link_counts = [0] * len(LINK_COUNTERS)
+        return data
+
+    def flush_pending_outputs(self):
+        """Zurückgestellte Schaltbefehle des identifizierten Geräts in die Sendewarteschlange."""
+        if not self.identnr:
+            return
+        queued = self.server.pending_outputs.take(self.identnr)
+        if queued:
+            _LOGGER.info(f"{len(queued)} zurückgestellte Schaltbefehle an {self.identnr}")
+            self.send_output_commands(queued)
+
+    def remember_frame(self, frame_key, acks):
+        self._seen_frames[frame_key] = acks
+        if len(self._seen_frames) > DUPLICATE_WINDOW:
+            del self._seen_frames[next(iter(self._seen_frames))]
+
     def parse_vds_payload(self, data):
         offset = 0
         records = []
@@ -594,25 +1062,24 @@ class VdSConnection:
         for typ, content, sl in records:
             _LOGGER.debug(f"Verarbeite Kontext-Satztyp 0x{typ:02X}, Länge {sl}")
             if typ == 0x56: # Identnummer
-                self.identnr = self.decode_ident(content)
+                self.identnr = decode_ident(content)
                 _LOGGER.info(f"Meldungseingang von ({self.peer}): ID: {self.identnr}")
                 packet_context["identnr"] = self.identnr
                 
-                matched_dev_config = None
-                matched_keynr = 0
-                
-                for conf in self.devices_config:
-                    if conf.get('identnr') == self.identnr:
-                        matched_dev_config = conf
-                        matched_keynr = int(conf.get('keynr', 0))
-                        break
+                matched_dev_config = self.server.index.by_ident.get(self.identnr)
                 
+                if matched_dev_config and not self.admit_device(matched_dev_config):
+                    asyncio.create_task(self.disconnect())
+                    return
                 if matched_dev_config:
+                    matched_keynr = int(matched_dev_config.get('keynr', 0))
                     self.device_config = matched_dev_config
                     if self.key_nr_rec != matched_keynr:
                         _LOGGER.warning(f"Mismatch ({self.identnr}): KeyNr {self.key_nr_rec} empfangen, {matched_keynr} erwartet")
                 else:
                      _LOGGER.warning(f"Unbekannte Identnummer {self.identnr} von {self.peer}")
+                     self.metrics.inc("unknown_identnr")
+                     self.server.remember_reject(self.peer_ip)
                      asyncio.create_task(self.disconnect())
                      return
 
@@ -654,7 +1121,7 @@ class VdSConnection:
             elif typ == 0x73: # Telegrammzähler
                 try:
                     if len(content) >= 5:
-                        counter = struct.unpack('>I', content[1:5])[0]
+                        counter = UINT32.unpack_from(content, 1)[0]
                         packet_context["telegram_counter"] = counter
                 except Exception: pass
             
@@ -714,7 +1181,7 @@ class VdSConnection:
                     err_text = VDS_ERRORS.get(err_code, f"Unbekannter Fehler {err_code}")
                     _LOGGER.warning(f"VdS Fehler ({self.identnr}): {err_text} (Code: {err_code}, Geraet: {geraet})")
                     if self.event_callback:
-                        self.event_callback("error", {"identnr": self.identnr, "code": err_code, "text": err_text})
+                        self.event_callback("error", {"identnr": self.identnr, "code": err_code, "text": err_text, "geraet": geraet})
 
             elif typ == 0x40: # Testmeldung
                 if self.event_callback:
@@ -757,46 +1224,93 @@ class VdSConnection:
                 if self.event_callback and features:
                     self.event_callback("features_update", {"identnr": self.identnr, "features": features})
 
-    def decode_ident(self, data):
-        res = ""
-        for b in data:
-            low = b & 0x0F; high = (b >> 4) & 0x0F
-            if low != 0xF: res += str(low)
-            if high != 0xF: res += str(high)
-        return res
+    def send_output_commands(self, commands):
+        """Schaltbefehle (address, state, device, area) gebündelt in möglichst wenigen IK4-Paketen."""
+        payload = bytearray()
+        for address, state, device, area in commands:
+            record = output_record(address, state, device, area)
+            if len(payload) + len(record) > MAX_PAYLOAD_LENGTH:
+                self.send_queue.append(payload)
+                payload = bytearray()
+            payload += record
+        if payload:
+            self.send_queue.append(payload)
 
     def send_output_command(self, address, state, device=1, area=1):
-        payload = bytearray(7)
-        payload[0] = 5; payload[1] = 0x02
-        gebe = ((device << 4) & 0xF0) | (area & 0x0F)
-        payload[2] = gebe
-        payload[3] = address & 0xFF
-        payload[4] = 0x00; payload[5] = 0x02
-        payload[6] = 0x00 if state else 0x80
-        self.send_queue.append(payload)
+        self.send_output_commands(((address, state, device, area),))
 
 class VdSAsyncServer:
-    def __init__(self, host, port, devices, event_callback, polling_interval=5):
+    def __init__(self, host, port, devices, event_callback, polling_interval=5, metrics=None, reuse_port=False,
+                 offload_threshold=DEFAULT_OFFLOAD_THRESHOLD, listeners=None, max_connections=0, connect_rate=0,
+                 keepalive_idle=0, keepalive_interval=0, user_timeout=0, idle_timeout=0,
+                 link_stats_interval=LINK_STATS_INTERVAL, rto_min=DEFAULT_RTO_MIN, rto_max=DEFAULT_RTO_MAX,
+                 output_queue_ttl=OUTPUT_QUEUE_TTL, output_queue_limit=OUTPUT_QUEUE_LIMIT):
         self.host = host
         self.port = port
-        self.devices = devices
+        # Eigene Accept-Queue je Listener; Geräte, Callback und Metriken sind gemeinsam
+        self.listeners = list(listeners) if listeners else [Listener(host, port, 0)]
+        self._listener_connections = collections.Counter()
+        # Zulassung vor dem Handshake (0 = aus)
+        self.max_connections = max_connections
+        self._connect_guard = FloodGuard(connect_rate)
+        self._rejected = {} # ip -> monotonic Ablaufzeit
+        # Erkennung toter Gegenstellen (Sekunden, 0 = aus)
+        self.keepalive_idle = keepalive_idle
+        self.keepalive_interval = keepalive_interval
+        self.user_timeout = user_timeout
+        self.idle_timeout = idle_timeout
+        self._reaper_task = None
+        self.link_stats_interval = link_stats_interval
+        self.rto_min = rto_min
+        self.rto_max = max(rto_min, rto_max)
+        self._stats_task = None
+        self.offload_threshold = offload_threshold
+        # Sendepuffer aller Verbindungen auf dieser Event-Loop; build() läuft ohne await durch
+        self.frame_builder = FrameBuilder()
+        self.reuse_port = reuse_port # SO_REUSEPORT, damit mehrere Worker-Prozesse denselben Port teilen
+        self.index = DeviceIndex(devices)
         self.event_callback = event_callback
         self.polling_interval = polling_interval
-        self.server = None
+        self.servers = []
         self._connections = set()
+        self.metrics = metrics if metrics is not None else ReceiverMetrics()
+        self.metrics.add_gauge("active_connections", lambda: len(self._connections), "Open transmitter connections")
+        self.metrics.add_gauge("send_queue_depth", self.send_queue_depth, "Records waiting in connection send queues")
+        # Schaltbefehle an Geräte ohne Verbindung, bis sie sich wieder melden
+        self.pending_outputs = PendingCommands(output_queue_ttl, output_queue_limit, self.metrics)
+        self.metrics.add_gauge("pending_output_commands", self.pending_output_count,
+                               "Output commands waiting for their device to connect")
 
     async def start(self):
-        self.server = await asyncio.start_server(
-            self.handle_client, self.host, self.port, reuse_address=True
-        )
-        _LOGGER.info(f"VdS Server gestartet auf Port {self.port}")
-        return self.server
+        for listener in self.listeners:
+            try:
+                server = await asyncio.start_server(
+                    functools.partial(self.handle_client, listener=listener), listener.host, listener.port,
+                    reuse_address=True, reuse_port=self.reuse_port or None
+                )
+            except OSError:
+                await self.stop()
+                raise
+            self.servers.append(server)
+            _LOGGER.info(f"VdS Server gestartet auf {listener.host}:{listener.port}")
+        if self.idle_timeout > 0:
+            self._reaper_task = asyncio.create_task(self.reap_idle_connections())
+        if self.link_stats_interval > 0:
+            self._stats_task = asyncio.create_task(self.report_link_stats())
+        return self.servers
 
     async def stop(self):
         _LOGGER.debug("VdSAsyncServer.stop() called")
-        if self.server:
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        if self._stats_task:
+            self._stats_task.cancel()
+            self._stats_task = None
+        servers, self.servers = self.servers, []
+        for server in servers:
             _LOGGER.debug("Closing server socket (stop accepting)...")
-            self.server.close()
+            server.close()
         if self._connections:
             _LOGGER.info(f"Closing {len(self._connections)} active connections")
             for conn in list(self._connections):
@@ -804,26 +1318,167 @@ class VdSAsyncServer:
                     await conn.disconnect()
                 except Exception: pass
             self._connections.clear()
-        if self.server:
+            self._listener_connections.clear()
+        for server in servers:
             try:
-                await asyncio.wait_for(self.server.wait_closed(), timeout=2.0)
+                await asyncio.wait_for(server.wait_closed(), timeout=2.0)
                 _LOGGER.debug("Server socket closed")
             except Exception: pass
 
-    async def handle_client(self, reader, writer):
-        conn = VdSConnection(reader, writer, self.devices, self.event_callback, self.polling_interval)
+    async def reap_idle_connections(self):
+        """Verbindungen ohne gültiges Paket seit idle_timeout Sekunden schließen."""
+        while True:
+            await asyncio.sleep(min(REAPER_INTERVAL, max(1, self.idle_timeout / 2)))
+            now = time.monotonic()
+            for conn in list(self._connections):
+                idle = now - conn.last_valid_rx
+                if idle > self.idle_timeout:
+                    _LOGGER.info(f"Keine gültigen Pakete von {conn.identnr or conn.peer} seit {idle:.0f}s, trenne Verbindung")
+                    self.metrics.inc("reaped_connections")
+                    try:
+                        await conn.disconnect()
+                    except Exception as e:
+                        _LOGGER.debug(f"Fehler beim Trennen von {conn.peer}: {e}")
+
+    async def report_link_stats(self):
+        """Gerätestatistik jeder identifizierten Verbindung als link_stats-Ereignis melden."""
+        while True:
+            await asyncio.sleep(self.link_stats_interval)
+            for conn in list(self._connections):
+                if conn.identnr and conn._running:
+                    try:
+                        self.event_callback("link_stats", conn.take_link_stats())
+                    except Exception as e:
+                        _LOGGER.error(f"Fehler im link_stats-Callback: {e}")
+
+    def trusted_source(self, ip):
+        """Adresse, die nie pauschal gesperrt wird: freigegeben oder mit identifizierter Verbindung.
+
+        Hinter NAT oder VPN teilen sich mehrere Übertragungsgeräte eine Adresse;
+        ein falsch konfiguriertes Gerät darf die übrigen nicht aussperren.
+        """
+        if ip is None:
+            return False
+        if self.index.source_listed(ip):
+            return True
+        return any(
+            conn.peer_ip == ip and conn.identnr in self.index.by_ident for conn in self._connections
+        )
+
+    def remember_reject(self, ip):
+        """Weitere Verbindungen dieser Adresse eine Zeit lang ohne Protokoll abweisen."""
+        if ip is None or self.trusted_source(ip):
+            return
+        now = time.monotonic()
+        if len(self._rejected) >= ADMISSION_TABLE_SIZE:
+            self._rejected = {k: t for k, t in self._rejected.items() if t > now}
+            if len(self._rejected) >= ADMISSION_TABLE_SIZE:
+                self._rejected.pop(next(iter(self._rejected)))
+        self._rejected[ip] = now + REJECT_CACHE_SECONDS
+
+    def admission_error(self, peer, listener):
+        """Grund für die Abweisung einer neuen Verbindung, None wenn sie zugelassen wird.
+
+        Läuft vor jeglichem Protokollzustand und prüft das Günstigste zuerst.
+        """
+        ip = peer_address(peer)
+        now = time.monotonic()
+        expires = self._rejected.get(ip)
+        if expires is not None:
+            if expires > now and not self.trusted_source(ip):
+                return "kürzlich unbekannte KeyNr/Identnr"
+            del self._rejected[ip]
+        if self.max_connections and len(self._connections) >= self.max_connections:
+            return f"Verbindungslimit {self.max_connections} erreicht"
+        if listener is not None and listener.max_connections \
+                and self._listener_connections[listener] >= listener.max_connections:
+            return f"Verbindungslimit für {listener.host}:{listener.port} erreicht"
+        if ip is not None and not self.index.peer_allowed(ip):
+            return "Adresse nicht erlaubt"
+        if len(self._connect_guard) >= ADMISSION_TABLE_SIZE:
+            self._connect_guard.prune(now)
+        if not self._connect_guard.admit(ip, now) and not self.trusted_source(ip):
+            return "zu viele Verbindungsversuche"
+        return None
+
+    def handle_client(self, reader, writer, listener=None):
+        """Accept-Callback; liefert VdSConnection.run(), das asyncio als Task startet.
+
+        Keine eigene Koroutine je Verbindung um run() herum, das spart deren Rahmen.
+        """
+        peer = writer.get_extra_info('peername')
+        reason = self.admission_error(peer, listener)
+        if reason is not None:
+            _LOGGER.debug(f"Verbindung von {peer} abgewiesen: {reason}")
+            self.metrics.inc("rejected_connections")
+            writer.close()
+            return None
+
+        set_keepalive(writer.get_extra_info('socket'), self.keepalive_idle, self.keepalive_interval, self.user_timeout)
+        conn = VdSConnection(reader, writer, self, listener)
         self._connections.add(conn)
-        try:
-            await conn.run()
-        finally:
+        self._listener_connections[listener] += 1
+        return conn.run()
+
+    def connection_closed(self, conn):
+        if conn in self._connections:
             self._connections.discard(conn)
+            self._listener_connections[conn.listener] -= 1
 
-    def send_output_command(self, identnr, address, state, device=1, area=1):
+    async def update_devices(self, devices):
+        """Swap in a new device list without touching unaffected connections.
+
+        Connections whose device was removed or whose KeyNr/key changed are
+        closed; all others are re-bound to their new config entry.
+        """
+        self.index = DeviceIndex(devices)
+        # Ein neues Gerät kann eine eben noch unbekannte Gegenstelle sein
+        self._rejected.clear()
+        stale = []
+        for conn in self._connections:
+            if conn.identnr:
+                new_conf = self.index.by_ident.get(conn.identnr)
+            elif conn.device_config is not None:
+                new_conf = self.index.by_keynr.get(conn.key_nr_rec)
+            else:
+                continue # noch nicht identifiziert
+            if conn.device_config is None:
+                # Unverschlüsselt (KeyNr 0): device_config wird je Paket zurückgesetzt,
+                # getrennt wird, wenn das Gerät fehlt oder jetzt einen Schlüssel verlangt
+                changed = new_conf is not None and new_conf.get('encrypted', True) and bool(new_conf.get('key'))
+            else:
+                changed = new_conf is not None and not same_credentials(conn.device_config, new_conf)
+            if new_conf is None or changed or not self.index.device_allowed(new_conf, conn.peer_ip):
+                stale.append(conn)
+            elif conn.device_config is not None:
+                conn.device_config = new_conf
+
+        for conn in stale:
+            _LOGGER.info(f"Gerätekonfiguration für {conn.identnr or conn.peer} geändert, trenne Verbindung")
+            await conn.disconnect()
+        return len(stale)
+
+    def send_output_commands(self, identnr, commands):
+        """Schaltbefehle für ein Gerät; ohne Verbindung zurückgestellt, False bei unbekannter Identnummer."""
         for conn in self._connections:
             if conn.identnr == identnr:
-                conn.send_output_command(address, state, device, area)
+                conn.send_output_commands(commands)
                 return True
-        return False
+        if identnr not in self.index.by_ident:
+            return False
+        _LOGGER.info(f"Gerät {identnr} nicht verbunden, Schaltbefehle zurückgestellt")
+        self.pending_outputs.add(identnr, commands)
+        return True
+
+    def pending_output_count(self):
+        self.pending_outputs.prune()
+        return len(self.pending_outputs)
+
+    def send_output_command(self, identnr, address, state, device=1, area=1):
+        return self.send_output_commands(identnr, ((address, state, device, area),))
+
+    def send_queue_depth(self):
+        return sum(len(conn.send_queue) for conn in self._connections)
 
     def is_connected(self, identnr):
         """Check if a device with the given identnr is connected."""
@@ -0,0 +1,392 @@
+import asyncio
+import logging
+import multiprocessing
+import socket
+import threading
+
+from .metrics import ReceiverMetrics
+from .profiler import profile_loop
+from .vds_lib import (
+    DeviceIndex, Listener, PendingCommands, VdSAsyncServer, OUTPUT_QUEUE_LIMIT, OUTPUT_QUEUE_TTL
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds between metric snapshots sent from a worker to the hub
+METRICS_REPORT_INTERVAL = 5
+WORKER_START_TIMEOUT = 30
+WORKER_STOP_TIMEOUT = 5
+WORKER_RESTART_DELAY = 5
+
+
+def reuse_port_supported():
+    return hasattr(socket, "SO_REUSEPORT")
+
+
+# --- Worker process side ---
+
+class _PipeSender:
+    """Serializes writes to the pipe from the event loop and logging."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                pass
+
+
+class _PipeLogHandler(logging.Handler):
+    """Forwards log records of the worker to the hub process."""
+
+    def __init__(self, sender):
+        super().__init__()
+        self.sender = sender
+
+    def emit(self, record):
+        try:
+            self.sender.send(("log", record.levelno, record.name, record.getMessage()))
+        except Exception:
+            self.handleError(record)
+
+
+async def _report_metrics(server, sender):
+    while True:
+        await asyncio.sleep(METRICS_REPORT_INTERVAL)
+        sender.send(("metrics", server.metrics.snapshot(), len(server._connections), server.send_queue_depth()))
+
+
+async def _worker_loop(host, port, devices, polling_interval, server_options, conn, sender):
+    loop = asyncio.get_running_loop()
+    server = VdSAsyncServer(
+        host, port, devices, lambda event_type, data: sender.send(("event", event_type, data)),
+        polling_interval, reuse_port=True, **server_options
+    )
+    try:
+        await server.start()
+    except OSError as e:
+        sender.send(("error", str(e)))
+        return
+    sender.send(("ready",))
+
+    commands = asyncio.Queue()
+    tasks = set()
+
+    def on_readable():
+        try:
+            while conn.poll():
+                commands.put_nowait(conn.recv())
+        except (EOFError, OSError):
+            # Hub process is gone
+            loop.remove_reader(conn.fileno())
+            commands.put_nowait(("stop",))
+
+    loop.add_reader(conn.fileno(), on_readable)
+    metrics_task = asyncio.create_task(_report_metrics(server, sender))
+    try:
+        while True:
+            message = await commands.get()
+            if message[0] == "stop":
+                break
+            if message[0] == "devices":
+                await server.update_devices(message[1])
+            elif message[0] == "profile":
+                # Runs alongside the protocol; the command loop must keep serving outputs meanwhile
+                task = asyncio.create_task(_profile(message[1], message[2], sender))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            elif message[0] == "outputs":
+                identnr, output_commands = message[1:]
+                # Only the hub queues for offline devices; the next connection may land on another worker
+                if not server.is_connected(identnr):
+                    sender.send(("undelivered", identnr, output_commands))
+                else:
+                    server.send_output_commands(identnr, output_commands)
+    finally:
+        metrics_task.cancel()
+        for task in tasks:
+            task.cancel()
+        await server.stop()
+        sender.send(("metrics", server.metrics.snapshot(), 0, 0))
+
+
+async def _profile(seconds, path, sender):
+    try:
+        sender.send(("profile", path, await profile_loop(seconds, path)))
+    except (OSError, RuntimeError) as e:
+        sender.send(("profile_error", str(e)))
+
+
+def _worker_main(worker_id, host, port, devices, polling_interval, server_options, log_level, conn):
+    """Entry point of a worker process."""
+    sender = _PipeSender(conn)
+    root = logging.getLogger()
+    root.handlers[:] = [_PipeLogHandler(sender)]
+    root.setLevel(log_level)
+    try:
+        asyncio.run(_worker_loop(host, port, devices, polling_interval, server_options, conn, sender))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+# --- Hub side ---
+
+class _Worker:
+    def __init__(self, worker_id, process, conn):
+        self.id = worker_id
+        self.process = process
+        self.conn = conn
+        self.ready = asyncio.get_running_loop().create_future()
+        self.snapshot = None
+        self.connections = 0
+        self.queue_depth = 0
+        # Future for the result of a running profile
+        self.profile = None
+
+
+class ShardedVdSServer:
+    """VdSAsyncServer replacement that runs the protocol in worker processes.
+
+    All workers listen on the same ports (SO_REUSEPORT), the kernel spreads
+    incoming connections across them. Decoded events come back over a pipe
+    and are passed to event_callback on the hub's event loop. server_options
+    are passed to each worker's VdSAsyncServer; connection limits and rate
+    limits apply per worker.
+    """
+
+    def __init__(self, host, port, devices, event_callback, polling_interval=5, metrics=None, workers=2,
+                 **server_options):
+        self.host = host
+        self.server_options = server_options
+        self.listeners = list(server_options.get("listeners") or [Listener(host, port, 0)])
+        self.port = port
+        self.devices = list(devices)
+        self.index = DeviceIndex(self.devices)
+        self.event_callback = event_callback
+        self.polling_interval = polling_interval
+        self.worker_count = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers = {}
+        self._owner = {} # identnr -> worker id of its connection
+        self._tasks = set()
+        self._stopping = False
+        self.metrics = metrics if metrics is not None else ReceiverMetrics()
+        self.metrics.add_gauge("active_connections", self.active_connections, "Open transmitter connections")
+        self.metrics.add_gauge("send_queue_depth", self.send_queue_depth, "Records waiting in connection send queues")
+        # Commands for devices without a connection stay here; the worker is not known until they connect
+        self.pending_outputs = PendingCommands(
+            server_options.get("output_queue_ttl", OUTPUT_QUEUE_TTL),
+            server_options.get("output_queue_limit", OUTPUT_QUEUE_LIMIT),
+            self.metrics,
+        )
+        self.metrics.add_gauge("pending_output_commands", self.pending_output_count,
+                               "Output commands waiting for their device to connect")
+
+    async def start(self):
+        self._stopping = False
+        for worker_id in range(self.worker_count):
+            await self._spawn(worker_id)
+        try:
+            for worker in list(self._workers.values()):
+                await asyncio.wait_for(asyncio.shield(worker.ready), WORKER_START_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as e:
+            await self.stop()
+            raise OSError(f"VdS worker failed to start: {e}") from e
+        addresses = ", ".join(f"{l.host}:{l.port}" for l in self.listeners)
+        _LOGGER.info(f"VdS Server started on {addresses} with {self.worker_count} worker processes")
+
+    async def _spawn(self, worker_id):
+        if self._stopping:
+            return
+        loop = asyncio.get_running_loop()
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_id, self.host, self.port, self.devices, self.polling_interval, self.server_options,
+                logging.getLogger(VdSAsyncServer.__module__).getEffectiveLevel(), child_conn
+            ),
+            name=f"vds2465-worker-{worker_id}",
+            daemon=True,
+        )
+        await loop.run_in_executor(None, process.start)
+        child_conn.close()
+        worker = _Worker(worker_id, process, parent_conn)
+        self._workers[worker_id] = worker
+        loop.add_reader(parent_conn.fileno(), self._on_readable, worker)
+
+    def _on_readable(self, worker):
+        try:
+            while worker.conn.poll():
+                self._handle_message(worker, worker.conn.recv())
+        except (EOFError, OSError):
+            self._worker_exited(worker)
+
+    def _handle_message(self, worker, message):
+        kind = message[0]
+        if kind == "event":
+            event_type, data = message[1], message[2]
+            identnr = data.get("identnr")
+            if event_type == "connected" and identnr:
+                self._owner[identnr] = worker.id
+                queued = self.pending_outputs.take(identnr)
+                if queued:
+                    _LOGGER.info(f"Sending {len(queued)} queued output commands to {identnr}")
+                    self._send(worker, ("outputs", identnr, queued))
+            elif event_type == "disconnected" and self._owner.get(identnr) == worker.id:
+                del self._owner[identnr]
+            try:
+                self.event_callback(event_type, data)
+            except Exception as e:
+                _LOGGER.error(f"Error in VdS event callback: {e}", exc_info=True)
+        elif kind == "undelivered":
+            # The device hung up before the worker got the commands; its events up to here are
+            # already handled, so only a connection on another worker can take them now
+            identnr, commands = message[1:]
+            owner = self._workers.get(self._owner.get(identnr))
+            if owner is not None and owner is not worker:
+                self._send(owner, ("outputs", identnr, commands))
+            else:
+                _LOGGER.info(f"VdS device {identnr} not connected, output commands queued")
+                self.pending_outputs.add(identnr, commands)
+        elif kind == "metrics":
+            snapshot, worker.connections, worker.queue_depth = message[1:]
+            self.metrics.add_delta(snapshot, worker.snapshot)
+            worker.snapshot = snapshot
+        elif kind in ("profile", "profile_error"):
+            if worker.profile is not None and not worker.profile.done():
+                if kind == "profile":
+                    worker.profile.set_result({"worker": worker.id, "file": message[1], "functions": message[2]})
+                else:
+                    worker.profile.set_exception(OSError(message[1]))
+        elif kind == "log":
+            level, name, text = message[1:]
+            logging.getLogger(name).log(level, f"[worker {worker.id}] {text}")
+        elif kind == "ready":
+            if not worker.ready.done():
+                worker.ready.set_result(None)
+        elif kind == "error":
+            if not worker.ready.done():
+                worker.ready.set_exception(OSError(message[1]))
+
+    def _worker_exited(self, worker):
+        if worker.conn.closed:
+            return
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(worker.conn.fileno())
+        worker.conn.close()
+        if self._workers.get(worker.id) is worker:
+            del self._workers[worker.id]
+        if not worker.ready.done():
+            worker.ready.set_exception(OSError(f"worker {worker.id} exited during startup"))
+        if worker.profile is not None and not worker.profile.done():
+            worker.profile.set_exception(OSError(f"worker {worker.id} exited"))
+
+        for identnr in [i for i, owner in self._owner.items() if owner == worker.id]:
+            del self._owner[identnr]
+            try:
+                self.event_callback("disconnected", {"identnr": identnr, "keynr": None})
+            except Exception as e:
+                _LOGGER.error(f"Error in disconnect callback: {e}")
+
+        if self._stopping:
+            return
+        if worker.ready.exception():
+            _LOGGER.error(f"VdS worker {worker.id} failed: {worker.ready.exception()}")
+            return
+        _LOGGER.error(f"VdS worker {worker.id} exited unexpectedly, restarting in {WORKER_RESTART_DELAY}s")
+        loop.call_later(WORKER_RESTART_DELAY, self._schedule_restart, worker.id)
+
+    def _schedule_restart(self, worker_id):
+        task = asyncio.create_task(self._spawn(worker_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _send(self, worker, message):
+        try:
+            worker.conn.send(message)
+            return True
+        except (OSError, ValueError) as e:
+            _LOGGER.warning(f"Could not reach VdS worker {worker.id}: {e}")
+            return False
+
+    async def stop(self):
+        self._stopping = True
+        loop = asyncio.get_running_loop()
+        workers = list(self._workers.values())
+        for worker in workers:
+            self._send(worker, ("stop",))
+        for worker in workers:
+            await loop.run_in_executor(None, worker.process.join, WORKER_STOP_TIMEOUT)
+            if worker.process.is_alive():
+                _LOGGER.warning(f"VdS worker {worker.id} did not stop, terminating")
+                worker.process.terminate()
+            # Pick up the final metrics before closing the pipe
+            if not worker.conn.closed:
+                self._on_readable(worker)
+        self._workers.clear()
+        self._owner.clear()
+
+    async def update_devices(self, devices):
+        """Send the new device list to all workers; they close affected connections themselves."""
+        self.devices = list(devices)
+        self.index = DeviceIndex(self.devices)
+        for worker in self._workers.values():
+            self._send(worker, ("devices", self.devices))
+        return 0
+
+    def send_output_commands(self, identnr, commands):
+        """Forward a batch of output commands to the worker holding the device's connection.
+
+        Commands for a configured device without a connection are queued until it connects.
+        """
+        worker = self._workers.get(self._owner.get(identnr))
+        if worker is not None:
+            return self._send(worker, ("outputs", identnr, list(commands)))
+        if identnr not in self.index.by_ident:
+            return False
+        _LOGGER.info(f"VdS device {identnr} not connected, output commands queued")
+        self.pending_outputs.add(identnr, commands)
+        return True
+
+    async def profile_workers(self, seconds, path_for):
+        """Profile every worker for `seconds`; path_for(worker_id) names its pstats file.
+
+        Returns the summaries of the workers that answered.
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for worker in list(self._workers.values()):
+            worker.profile = loop.create_future()
+            if self._send(worker, ("profile", seconds, path_for(worker.id))):
+                futures.append(worker.profile)
+        results = []
+        for future in futures:
+            try:
+                results.append(await asyncio.wait_for(future, seconds + WORKER_START_TIMEOUT))
+            except (OSError, asyncio.TimeoutError) as e:
+                _LOGGER.warning(f"No profile from VdS worker: {e!r}")
+        return results
+
+    def pending_output_count(self):
+        self.pending_outputs.prune()
+        return len(self.pending_outputs)
+
+    def send_output_command(self, identnr, address, state, device=1, area=1):
+        return self.send_output_commands(identnr, [(address, state, device, area)])
+
+    def active_connections(self):
+        return sum(worker.connections for worker in self._workers.values())
+
+    def send_queue_depth(self):
+        return sum(worker.queue_depth for worker in self._workers.values())
+
+    def is_connected(self, identnr):
+        """Check if a device with the given identnr is connected to any worker."""
+        return identnr in self._owner
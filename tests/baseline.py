@@ -0,0 +1,82 @@
+"""Reference implementations from before the framing/CRC rewrite, kept verbatim for comparison."""
+import binascii
+import struct
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+MIN_LENGTH = 48
+
+
+def calculate_checksum_logic(data, check_mode=False):
+    crc = 0
+    original = 0
+    length = len(data)
+    for pos in range(0, length, 2):
+        temp = data[pos] << 8
+        if pos + 1 == length:
+            temp |= 0x00
+        else:
+            temp |= data[pos + 1]
+
+        if check_mode and pos == 4:
+            original = temp
+        else:
+            crc += temp
+            if crc > 65535:
+                crc &= 0xffff
+                crc += 1
+
+    crc = ~crc & 0xffff
+    return crc, original
+
+
+def set_crc16(data):
+    crc, _ = calculate_checksum_logic(data, check_mode=True)
+    struct.pack_into('>H', data, 4, crc)
+    return data
+
+
+def pad_data(data):
+    length = len(data)
+    diff = 16 - (length % 16)
+    if length + diff < MIN_LENGTH:
+        diff = MIN_LENGTH - length
+    return data + (b'\x00' * diff)
+
+
+def encrypt(key_hex, data):
+    if not key_hex:
+        return data
+    cipher = Cipher(algorithms.AES(binascii.unhexlify(key_hex)), modes.CBC(b'\x00' * 16), backend=default_backend())
+    encryptor = cipher.encryptor()
+    return encryptor.update(data) + encryptor.finalize()
+
+
+def prepare_packet(key_nr, key_hex, frame):
+    """VdSConnection.prepare_packet with key_nr_rec = key_nr and the device key key_hex."""
+    payload = bytearray(pad_data(frame))
+    set_crc16(payload)
+    payload = bytes(payload)
+    if key_nr > 0:
+        payload = encrypt(key_hex, payload)
+    return struct.pack('>HH', key_nr, len(payload)) + payload
+
+
+def frame_header(tc, rc, ik, length):
+    buf = bytearray(13)
+    struct.pack_into('>I', buf, 0, tc)
+    struct.pack_into('>I', buf, 6, rc)
+    buf[10] = ik
+    buf[11] = 1
+    buf[12] = length
+    return buf
+
+
+def decode_ident(data):
+    res = ""
+    for b in data:
+        low = b & 0x0F; high = (b >> 4) & 0x0F
+        if low != 0xF: res += str(low)
+        if high != 0xF: res += str(high)
+    return res
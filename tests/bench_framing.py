@@ -0,0 +1,28 @@
+"""user-040: FrameBuilder vs. the old prepare_packet, per frame, and the builder's footprint.
+
+    python tests/benchmarks.py framing
+"""
+import tracemalloc
+
+import baseline
+from benchmarks import KEY, per_call_us
+from custom_components.vds2465 import vds_lib
+
+
+def run():
+    builder = vds_lib.FrameBuilder()
+    for key_nr, key_hex in ((0, None), (5, KEY)):
+        for ik, payload in ((3, b""), (4, bytes(7)), (4, bytes(200))):
+            frame = baseline.frame_header(123, 456, ik, len(payload)) + payload
+            old = per_call_us(lambda: baseline.prepare_packet(key_nr, key_hex, frame))
+            new = per_call_us(lambda: builder.build(key_nr, key_hex, 123, 456, ik, payload))
+            print(f"framing keynr={key_nr} ik={ik} payload={len(payload):3d}: baseline {old:6.2f} us, builder {new:6.2f} us")
+
+    tracemalloc.start()
+    builders = [vds_lib.FrameBuilder() for _ in range(1000)]
+    for builder in builders:
+        builder.build(5, KEY, 123, 456, 4, bytes(7))
+        builder.build(0, None, 123, 456, 3)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"framing memory: {current / len(builders):6.0f} B per FrameBuilder after use")
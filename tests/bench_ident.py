@@ -0,0 +1,15 @@
+"""user-044: BCD identnr decoding, lookup table vs. the old digit loop.
+
+    python tests/benchmarks.py ident
+"""
+import baseline
+from benchmarks import per_call_us
+from custom_components.vds2465 import vds_lib
+
+
+def run():
+    for data in (bytes([0x21, 0x43, 0x65, 0x87, 0xF9]), bytes([0x21, 0x43, 0x65, 0x87, 0x09, 0x21, 0x43, 0x65])):
+        digits = len(vds_lib.decode_ident(data))
+        old = per_call_us(lambda: baseline.decode_ident(data), 100000)
+        new = per_call_us(lambda: vds_lib.decode_ident(data), 100000)
+        print(f"decode_ident {digits:2d} digits: baseline {old:6.2f} us, table {new:6.2f} us")
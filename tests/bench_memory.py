@@ -0,0 +1,99 @@
+"""user-039: footprint per idle connection at 1,000 and 10,000 transmitters (target: <= 6.5 KB RSS).
+
+First the VdSConnection objects alone (tracemalloc), then real loopback
+sockets from a client subprocess, so transport, StreamReader and reader
+task are included in the RSS figure. Counts above the open file limit
+are skipped.
+
+    python tests/benchmarks.py memory
+"""
+import asyncio
+import gc
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+import benchmarks  # noqa: F401  (puts the repository root on sys.path)
+from custom_components.vds2465 import vds_lib
+
+
+class _IdleWriter:
+    def get_extra_info(self, name, default=None):
+        return ("192.0.2.1", 4100) if name == "peername" else default
+
+
+_IDLE_CLIENTS = """
+import socket, sys, time
+sockets = [socket.create_connection(("127.0.0.1", int(sys.argv[1]))) for _ in range(int(sys.argv[2]))]
+print("connected", flush=True)
+time.sleep(600)
+"""
+
+
+def _rss_kb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1])
+    return 0
+
+
+async def _connect_clients(server, port, count):
+    """Open count idle client sockets from a subprocess; returns once the server holds them."""
+    expected = len(server._connections) + count
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", _IDLE_CLIENTS, str(port), str(count), stdout=subprocess.PIPE
+    )
+    await process.stdout.readline()
+    while len(server._connections) < expected:
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(1)
+    return process
+
+
+def run():
+    async def measure():
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, [{"identnr": "1", "keynr": 0}], None, 3600)
+        # Real loopback sockets first, before freed objects of the tracemalloc runs distort RSS.
+        # 1,000 connections, then 9,000 more on top; the increment leaves out fixed start-up costs.
+        await server.start()
+        port = server.servers[0].sockets[0].getsockname()[1]
+        limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if limit < 10100:
+            print(f"memory sockets: skipped, open file limit is {limit}")
+        else:
+            await asyncio.sleep(0.2)
+            gc.collect()
+            base = _rss_kb()
+            clients = [await _connect_clients(server, port, 1000)]
+            first = _rss_kb()
+            print(f"memory  1000 sockets: {(first - base) * 1024 / 1000:6.0f} B RSS per idle connection")
+            clients.append(await _connect_clients(server, port, 9000))
+            total = _rss_kb()
+            print(f"memory 10000 sockets: {(total - base) * 1024 / 10000:6.0f} B RSS per idle connection, "
+                  f"{(total - first) * 1024 / 9000:6.0f} B for each of the last 9000")
+            for process in clients:
+                process.kill()
+                await process.wait()
+            while server._connections:
+                await asyncio.sleep(0.1)
+        writer = _IdleWriter()
+        for count in (1000, 10000):
+            gc.collect()
+            tracemalloc.start()
+            connections = [vds_lib.VdSConnection(None, writer, server) for _ in range(count)]
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"memory {count:5d} connections: {current / count:6.0f} B per VdSConnection (tracemalloc)")
+            tracemalloc.start()
+            for conn in connections:
+                conn.observe_rtt(0.05)
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"memory {count:5d} connections: {current / count:6.0f} B more after the first RTT sample")
+            del connections
+
+        await server.stop()
+
+    asyncio.run(measure())
@@ -0,0 +1,30 @@
+"""user-035: inline decode vs. executor hand-off, to place DEFAULT_OFFLOAD_THRESHOLD.
+
+The executor side is measured with time.thread_time, so it only counts what
+the hand-off costs the event loop thread (submitting the job and picking up
+the result), not the decode itself running in the worker thread.
+
+    python tests/benchmarks.py offload
+"""
+import asyncio
+import os
+import time
+
+from benchmarks import KEY, per_call_us
+from custom_components.vds2465 import vds_lib
+
+
+def run():
+    async def measure():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, vds_lib.decode_frames, [])
+        for size in (48, 128, 256, 512, 1024, 2048, 4096):
+            jobs = [(KEY, os.urandom(48)) for _ in range(size // 48)]
+            inline = per_call_us(lambda: vds_lib.decode_frames(jobs), 2000)
+            start = time.thread_time()
+            for _ in range(2000):
+                await loop.run_in_executor(None, vds_lib.decode_frames, jobs)
+            handoff = (time.thread_time() - start) / 2000 * 1e6
+            print(f"offload {size:5d} B: inline {inline:7.1f} us, loop time per executor hand-off {handoff:7.1f} us")
+
+    asyncio.run(measure())
@@ -0,0 +1,53 @@
+"""Micro-benchmarks for the frame, checksum and connection paths, compared with tests/baseline.py.
+
+Not collected by pytest. Run from the repository root:
+
+    python tests/benchmarks.py [framing|crc|ident|offload|memory ...]
+
+A benchmark `name` is either a bench_<name> function here or the run()
+function of tests/bench_<name>.py.
+"""
+import importlib
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from custom_components.vds2465 import vds_lib  # noqa: E402
+
+import baseline  # noqa: E402
+
+KEY = "00112233445566778899aabbccddeeff"
+
+
+def per_call_us(func, number=20000):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def bench_crc():
+    """user-042: full checksum vs. baseline, and the incremental update."""
+    for length in (48, 272):
+        data = bytearray(os.urandom(length))
+        old = per_call_us(lambda: baseline.calculate_checksum_logic(data, True))
+        new = per_call_us(lambda: vds_lib.calculate_checksum_logic(data, True))
+        print(f"crc {length:3d} B: baseline {old:6.2f} us, struct sum {new:6.2f} us")
+    old_words, new_words = (1, 2, 3, 4, 0x301), (5, 6, 7, 8, 0x401)
+    update = per_call_us(lambda: vds_lib.crc_update(0x1234, old_words, new_words))
+    print(f"crc_update (5 words): {update:6.2f} us")
+
+
+BENCHMARKS = ("framing", "crc", "ident", "offload", "memory")
+
+
+def _benchmark(name):
+    func = globals().get(f"bench_{name}")
+    if func is None:
+        func = importlib.import_module(f"bench_{name}").run
+    return func
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        _benchmark(name)()
@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+
+from custom_components.vds2465 import VdsHub
+from custom_components.vds2465.address_table import AddressStateTable
+
+
+class _Store:
+    """In-memory stand-in for helpers.storage.Store."""
+
+    def __init__(self):
+        self.data = None
+
+    async def async_load(self):
+        return self.data
+
+    def async_delay_save(self, data_func, delay=0):
+        self.data = data_func()
+
+
+def _alarm(adresse, zustand, quelle="Meldergruppe"):
+    return {"identnr": "99", "adresse": adresse, "text": "Einbruch", "code": 0x22, "zustand": zustand, "quelle": quelle}
+
+
+def test_address_states_survive_a_restart():
+    store = _Store()
+    hub = SimpleNamespace(address_table=AddressStateTable(), address_store=store)
+    hub.address_table.update(_alarm(1, "Ein"))
+    hub.address_table.update(_alarm(2, "Aus", quelle="Ausgang"))
+    VdsHub._schedule_address_save(hub)
+
+    restarted = SimpleNamespace(address_table=AddressStateTable(), address_store=store)
+    # A state received before the load finished is newer than the stored one
+    restarted.address_table.update(_alarm(1, "Aus"))
+    asyncio.run(VdsHub.async_load_address_states(restarted))
+
+    states = {(s["adresse"], s["kind"]): s for s in restarted.address_table.query("99")}
+    assert set(states) == {(1, "addr"), (2, "out")}
+    assert states[(1, "addr")]["zustand"] == "Aus"
+    assert states[(2, "out")]["zustand"] == "Aus"
+    assert states[(2, "out")]["last_changed"] == hub.address_table.query("99", 2)[0]["last_changed"]
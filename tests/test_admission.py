@@ -0,0 +1,109 @@
+import asyncio
+
+from custom_components.vds2465 import vds_lib
+from transmitter import Transmitter, ident_record, server_port
+
+
+async def _identified(port, identnr="99"):
+    tx = Transmitter()
+    await tx.connect(port)
+    await tx.recv()
+    await tx.send(tx.encode(4, ident_record(identnr)))
+    await tx.recv()
+    return tx
+
+
+async def _rejected_after_handshake(port):
+    """Connect and announce an unknown identnr; True once the server hangs up."""
+    tx = Transmitter()
+    await tx.connect(port)
+    await tx.recv()
+    await tx.send(tx.encode(4, ident_record("4711")))
+    return await tx.closed()
+
+
+async def _admitted(port):
+    """True if the server starts the handshake instead of closing at accept."""
+    tx = Transmitter()
+    await tx.connect(port)
+    try:
+        await tx.recv(2)
+        return True
+    except (EOFError, asyncio.TimeoutError):
+        return False
+    finally:
+        tx.close()
+
+
+def test_unknown_identnr_blocks_untrusted_source():
+    async def run():
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, [{"identnr": "99", "keynr": 0}], lambda *args: None, 0.5)
+        await server.start()
+        try:
+            port = server_port(server)
+            assert await _rejected_after_handshake(port)
+            assert not await _admitted(port)
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_identified_connection_keeps_shared_source_open():
+    async def run():
+        server = vds_lib.VdSAsyncServer(
+            "127.0.0.1", 0, [{"identnr": "99", "keynr": 0}], lambda *args: None, 0.5, connect_rate=1
+        )
+        await server.start()
+        try:
+            port = server_port(server)
+            good = await _identified(port)
+            # A misconfigured transmitter behind the same address
+            assert await _rejected_after_handshake(port)
+            # Neither the reject cache nor the exhausted rate bucket lock the address
+            assert await _admitted(port)
+            assert await _admitted(port)
+            good.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_allowed_source_is_never_blocked():
+    async def run():
+        devices = [{"identnr": "99", "keynr": 0, "allowed_ips": "127.0.0.1"}]
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, devices, lambda *args: None, 0.5, connect_rate=1)
+        await server.start()
+        try:
+            port = server_port(server)
+            assert await _rejected_after_handshake(port)
+            assert await _admitted(port)
+            assert await _admitted(port)
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_closed_connection_frees_its_listener_slot():
+    async def run():
+        listeners = [vds_lib.Listener("127.0.0.1", 0, 1)]
+        server = vds_lib.VdSAsyncServer(
+            "127.0.0.1", 0, [{"identnr": "99", "keynr": 0}], lambda *args: None, 0.5, listeners=listeners
+        )
+        await server.start()
+        try:
+            port = server_port(server)
+            tx = await _identified(port)
+            assert not await _admitted(port)
+            tx.close()
+            for _ in range(50):
+                if not server._connections:
+                    break
+                await asyncio.sleep(0.05)
+            assert await _admitted(port)
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import random
+
+from custom_components.vds2465 import vds_lib
+
+import baseline
+
+EDGE_WORDS = (0x0000, 0x0001, 0x7FFF, 0x8000, 0xFFFE, 0xFFFF)
+
+
+def _random_bytes(rng, length):
+    kind = rng.random()
+    if kind < 0.2:
+        return bytes(rng.choice((0x00, 0xFF)) for _ in range(length))
+    return bytes(rng.getrandbits(8) for _ in range(length))
+
+
+def test_checksum_matches_baseline():
+    rng = random.Random(42)
+    for _ in range(20000):
+        data = _random_bytes(rng, rng.choice((0, 1, 2, 5, 6, 7, 13, 47, 48, 64, 272, rng.randint(0, 300))))
+        for check_mode in (False, True):
+            assert vds_lib.calculate_checksum_logic(data, check_mode) == baseline.calculate_checksum_logic(data, check_mode)
+        assert vds_lib.check_crc16(bytearray(data)) == (
+            len(data) >= 6 and baseline.calculate_checksum_logic(data, True)[0] == baseline.calculate_checksum_logic(data, True)[1]
+        )
+
+
+def test_crc_update_matches_full_computation():
+    rng = random.Random(4242)
+    for _ in range(20000):
+        length = rng.choice((48, 64, 272, 2 * rng.randint(3, 136)))
+        frame = bytearray(_random_bytes(rng, length))
+        baseline.set_crc16(frame)
+
+        # Change 1-5 words outside the CRC field (word 2)
+        positions = rng.sample([i for i in range(length // 2) if i != 2], rng.randint(1, min(5, length // 2 - 1)))
+        old_words = [int.from_bytes(frame[2 * i:2 * i + 2], "big") for i in positions]
+        new_words = [rng.choice(EDGE_WORDS) if rng.random() < 0.3 else rng.getrandbits(16) for _ in positions]
+        for i, word in zip(positions, new_words):
+            frame[2 * i:2 * i + 2] = word.to_bytes(2, "big")
+
+        expected = bytearray(frame)
+        baseline.set_crc16(expected)
+        if not any(frame[:4]) and not any(frame[6:]):
+            continue # documented exception: an all-zero frame
+        assert vds_lib.set_crc16(frame, old_words, new_words) == expected
+
+
+def test_set_crc16_full_matches_baseline():
+    rng = random.Random(7)
+    for _ in range(5000):
+        frame = bytearray(_random_bytes(rng, rng.choice((48, 64, 272))))
+        assert vds_lib.set_crc16(bytearray(frame)) == baseline.set_crc16(bytearray(frame))
+
+
+def test_decode_ident_matches_baseline_and_is_interned():
+    rng = random.Random(44)
+    for _ in range(20000):
+        data = _random_bytes(rng, rng.randint(0, 10))
+        assert vds_lib.decode_ident(data) == baseline.decode_ident(data)
+    assert vds_lib.decode_ident(bytes([0x21, 0x43, 0xF5])) is vds_lib.intern_identnr("12345")
@@ -0,0 +1,53 @@
+import asyncio
+
+from custom_components.vds2465 import vds_lib
+from transmitter import Transmitter, ident_record, server_port
+
+
+async def _identified(server, identnr):
+    tx = Transmitter()
+    await tx.connect(server_port(server))
+    await tx.recv()
+    await tx.send(tx.encode(4, ident_record(identnr)))
+    await tx.recv()
+    # A later frame resets device_config of KeyNr-0 connections
+    await tx.send(tx.encode(3))
+    await tx.recv()
+    return tx
+
+
+def test_removing_unencrypted_device_closes_its_connection():
+    async def run():
+        events = []
+        devices = [{"identnr": "99", "keynr": 0, "encrypted": False}, {"identnr": "77", "keynr": 0, "encrypted": False}]
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, devices, lambda *event: events.append(event), 0.5)
+        await server.start()
+        try:
+            removed = await _identified(server, "99")
+            kept = await _identified(server, "77")
+
+            assert await server.update_devices(devices[1:]) == 1
+            assert await removed.closed()
+            assert ("disconnected", "99") in [(kind, data.get("identnr")) for kind, data in events]
+            assert server.is_connected("77")
+            kept.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_unencrypted_connection_closed_when_device_gets_a_key():
+    async def run():
+        devices = [{"identnr": "99", "keynr": 0, "encrypted": False}]
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, devices, lambda *event: None, 0.5)
+        await server.start()
+        try:
+            tx = await _identified(server, "99")
+            encrypted = [{"identnr": "99", "keynr": 3, "key": "00112233445566778899aabbccddeeff"}]
+            assert await server.update_devices(encrypted) == 1
+            assert await tx.closed()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
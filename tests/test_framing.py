@@ -0,0 +1,54 @@
+import itertools
+import random
+
+from custom_components.vds2465 import vds_lib
+
+import baseline
+
+KEYS = (None, "00112233445566778899aabbccddeeff", "ffeeddccbbaa99887766554433221100")
+
+
+def _random_frame(rng):
+    tc = rng.getrandbits(32)
+    rc = rng.getrandbits(32)
+    ik = rng.choice((1, 3, 4, 5, 6))
+    payload = bytes(rng.getrandbits(8) for _ in range(rng.choice((0, 0, 1, 7, rng.randint(0, 255)))))
+    return tc, rc, ik, payload
+
+
+def test_frame_builder_matches_baseline_for_every_keynr_and_key():
+    rng = random.Random(41)
+    builder = vds_lib.FrameBuilder()
+    for key_nr, key_hex in itertools.product((0, 1, 7, 0xFFFF), KEYS):
+        for _ in range(200):
+            tc, rc, ik, payload = _random_frame(rng)
+            expected = baseline.prepare_packet(
+                key_nr, key_hex, baseline.frame_header(tc, rc, ik, len(payload)) + payload
+            )
+            assert builder.build(key_nr, key_hex, tc, rc, ik, payload) == expected, (key_nr, key_hex, ik)
+
+
+def test_frame_builder_matches_baseline_with_interleaved_keys():
+    # One builder serves a connection whose key and KeyNr may change between frames
+    rng = random.Random(4141)
+    builder = vds_lib.FrameBuilder()
+    for _ in range(5000):
+        key_nr = rng.choice((0, 1, 3))
+        key_hex = rng.choice(KEYS)
+        tc, rc, ik, payload = _random_frame(rng)
+        expected = baseline.prepare_packet(key_nr, key_hex, baseline.frame_header(tc, rc, ik, len(payload)) + payload)
+        assert builder.build(key_nr, key_hex, tc, rc, ik, payload) == expected
+
+
+def test_built_frames_decode():
+    rng = random.Random(7)
+    builder = vds_lib.FrameBuilder()
+    for key_hex in KEYS:
+        key_nr = 1 if key_hex else 0
+        tc, rc, ik, payload = _random_frame(rng)
+        raw = builder.build(key_nr, key_hex, tc, rc, ik, payload)
+        data, crc_ok = vds_lib.decode_frame(key_hex, raw[vds_lib.LINK_HEADER.size:])
+        header = vds_lib.parse_header(data)
+        assert crc_ok
+        assert (header.tc, header.rc, header.ik, header.length) == (tc, rc, ik, len(payload))
+        assert data[vds_lib.FRAME_HEAD.size:vds_lib.FRAME_HEAD.size + len(payload)] == payload
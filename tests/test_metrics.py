@@ -0,0 +1,32 @@
+import asyncio
+
+from custom_components.vds2465.metrics import MetricsHttpServer
+
+
+async def _request(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    return response
+
+
+def test_overlong_request_line_closes_the_connection_quietly():
+    async def run():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        server = MetricsHttpServer("127.0.0.1", 0, lambda: "# EOF\n")
+        await server.start()
+        try:
+            port = server.server.sockets[0].getsockname()[1]
+            assert await _request(port, b"GET /" + b"a" * 100_000) == b""
+            assert await _request(port, b"GET /metrics HTTP/1.1\r\nX-Junk: " + b"a" * 100_000 + b"\r\n\r\n") == b""
+            # The server still answers normal scrapes
+            response = await _request(port, b"GET /metrics HTTP/1.1\r\n\r\n")
+            assert response.startswith(b"HTTP/1.1 200 OK") and response.endswith(b"# EOF\n")
+        finally:
+            await server.stop()
+        assert errors == []
+
+    asyncio.run(run())
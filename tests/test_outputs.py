@@ -0,0 +1,123 @@
+import asyncio
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.vds2465 import vds_lib
+from custom_components.vds2465.outputs import PendingOutputs
+from custom_components.vds2465.switch import VdsOutputSwitch
+from transmitter import Transmitter, ident_record, records, server_port
+
+
+async def _next_data_frame(tx, polls=5):
+    """Poll until the server sends an IK4 frame, None if it has nothing to send."""
+    for _ in range(polls):
+        frame = await tx.recv()
+        if vds_lib.parse_header(frame).ik == 4:
+            return frame
+        await tx.send(tx.encode(3))
+    return None
+
+
+def test_queued_output_is_sent_after_identification():
+    async def run():
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, [{"identnr": "99", "keynr": 0}], lambda *args: None, 0.5)
+        await server.start()
+        try:
+            assert server.send_output_commands("99", [(3, True, 1, 1)])
+            assert len(server.pending_outputs) == 1
+
+            tx = Transmitter()
+            await tx.connect(server_port(server))
+            await tx.recv()
+            await tx.send(tx.encode(4, ident_record("99")))
+            frame = await _next_data_frame(tx)
+            assert (0x02, bytes([0x11, 3, 0x00, 0x02, 0x00])) in records(frame)
+            assert len(server.pending_outputs) == 0
+            tx.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_retransmitted_ident_frame_does_not_resend_outputs():
+    async def run():
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, [{"identnr": "99", "keynr": 0}], lambda *args: None, 0.5)
+        await server.start()
+        try:
+            server.send_output_commands("99", [(3, True, 1, 1)])
+            tx = Transmitter()
+            await tx.connect(server_port(server))
+            await tx.recv()
+            ident_frame = tx.encode(4, ident_record("99"))
+            await tx.send(ident_frame)
+            frame = await _next_data_frame(tx)
+            assert any(typ == 0x02 for typ, _ in records(frame))
+
+            # Our ack got lost: the transmitter repeats the frame with the same TC
+            await tx.send(ident_frame)
+            frame = await _next_data_frame(tx, polls=3)
+            assert frame is None or not any(typ == 0x02 for typ, _ in records(frame))
+            assert server.metrics.counters["duplicate_frames"] == 1
+            tx.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_pending_commands_expire_and_are_bounded():
+    store = vds_lib.PendingCommands(ttl=10, limit=2)
+    store.add("99", [(1, True, 1, 1), (2, True, 1, 1), (3, False, 1, 1)], now=0)
+    assert [cmd[0] for cmd in store.take("99", now=5)] == [2, 3]
+    store.add("99", [(4, True, 1, 1)], now=0)
+    assert store.prune(now=10) == 1
+    assert len(store) == 0
+
+
+def test_parked_outputs_survive_disconnect_until_delivered():
+    async def run():
+        loop = asyncio.get_running_loop()
+        pending = PendingOutputs(loop, 30)
+        live, parked = loop.create_future(), loop.create_future()
+        pending.add("99", 1, live)
+        pending.add("99", 2, parked, 90, parked=True)
+
+        # A demand-dialled transmitter hangs up between calls
+        pending.fail("99", "disconnected", keep_parked=True)
+        assert isinstance(live.exception(), HomeAssistantError)
+        assert not parked.done() and len(pending) == 1
+
+        # Once it has connected, the command is on its way and a hang-up fails it
+        pending.delivered("99")
+        pending.fail("99", "disconnected", keep_parked=True)
+        assert isinstance(parked.exception(), HomeAssistantError)
+        assert len(pending) == 0
+
+    asyncio.run(run())
+
+
+class _Hub:
+    def __init__(self, loop):
+        self.future = loop.create_future()
+
+    def send_output(self, identnr, address, state, device=1, area=1):
+        return self.future
+
+
+def test_switch_returns_before_feedback_and_rolls_back_on_failure():
+    async def run():
+        hub = _Hub(asyncio.get_running_loop())
+        switch = VdsOutputSwitch(hub, "99", 3)
+        switch.hass = object()
+        written = []
+        switch.async_write_ha_state = lambda: written.append(switch.is_on)
+
+        await asyncio.wait_for(switch.async_turn_on(), 1)
+        assert switch.is_on is True and written == [True]
+
+        hub.future.set_exception(HomeAssistantError("no feedback"))
+        await asyncio.sleep(0)
+        assert switch.is_on is None and written == [True, None]
+
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from custom_components.vds2465 import VdsHub
+from custom_components.vds2465.rate_limit import FloodGuard
+
+
+def _hub(device_rate, address_rate):
+    return SimpleNamespace(_device_guard=FloodGuard(device_rate), _address_guard=FloodGuard(address_rate))
+
+
+def test_device_limit_does_not_charge_the_address():
+    hub = _hub(device_rate=2, address_rate=3)
+    assert VdsHub._admit(hub, "99", {"adresse": 1})
+    assert VdsHub._admit(hub, "99", {"adresse": 2})
+    # The device budget is used up; address 1 keeps its remaining two tokens
+    for _ in range(5):
+        assert not VdsHub._admit(hub, "99", {"adresse": 1})
+    assert hub._address_guard._buckets[("99", 1)].tokens >= 2
+
+
+def test_address_limit_does_not_charge_the_device():
+    hub = _hub(device_rate=3, address_rate=1)
+    assert VdsHub._admit(hub, "99", {"adresse": 1})
+    for _ in range(5):
+        assert not VdsHub._admit(hub, "99", {"adresse": 1})
+    assert VdsHub._admit(hub, "99", {"adresse": 2})
+    assert VdsHub._admit(hub, "99", {"adresse": 3})
+    assert not VdsHub._admit(hub, "99", {"adresse": 4})
+
+
+def test_zero_rate_admits_everything():
+    hub = _hub(device_rate=0, address_rate=0)
+    assert all(VdsHub._admit(hub, "99", {"adresse": 1}) for _ in range(1000))
+    assert len(hub._device_guard) == 0 and len(hub._address_guard) == 0
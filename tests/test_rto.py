@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+from custom_components.vds2465 import vds_lib
+from transmitter import Transmitter, ident_record, server_port
+
+
+async def _answer(tx, frame):
+    """Reply to a server frame with an empty IK3, as the next frame the server expects."""
+    header = vds_lib.parse_header(frame)
+    tx.tc = header.rc - 1
+    await tx.send(tx.encode(3, rc=(header.tc + 1) & 0xFFFFFFFF))
+
+
+def test_single_slow_reply_survives_default_rto():
+    async def run():
+        server = vds_lib.VdSAsyncServer("127.0.0.1", 0, [{"identnr": "99", "keynr": 0}], lambda *args: None, 0.2)
+        await server.start()
+        try:
+            tx = Transmitter()
+            await tx.connect(server_port(server))
+            frame = await tx.recv()
+            await tx.send(tx.encode(4, ident_record("99"), rc=vds_lib.parse_header(frame).tc + 1))
+            # Fast answers first, so the smoothed RTT is a few milliseconds and the RTO sits at its lower bound
+            for _ in range(5):
+                await _answer(tx, await tx.recv())
+            conn = next(iter(server._connections))
+            assert conn.srtt is not None and conn.srtt < 0.1
+
+            poll = await tx.recv()
+            # A transmitter that is busy once: the server retransmits meanwhile, but must not hang up
+            delay_until = time.monotonic() + 3.5
+            while time.monotonic() < delay_until:
+                try:
+                    await tx.recv(delay_until - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+            await _answer(tx, poll)
+            for _ in range(3):
+                frame = await tx.recv(3)
+                if vds_lib.parse_header(frame).ik == 3:
+                    await _answer(tx, frame)
+            assert server._connections
+            tx.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import socket
+from types import SimpleNamespace
+
+from custom_components.vds2465 import vds_lib
+from custom_components.vds2465.profiler import async_profile
+from custom_components.vds2465.workers import ShardedVdSServer
+from transmitter import Transmitter, ident_record, records
+from test_outputs import _next_data_frame
+
+
+def _free_port():
+    # Workers bind with SO_REUSEPORT, so the hub has to pick the port up front
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _event(events, event_type, timeout=10):
+    while True:
+        event = await asyncio.wait_for(events.get(), timeout)
+        if event[0] == event_type:
+            return event[1]
+
+
+def test_output_round_trip_through_a_worker():
+    async def run():
+        events = asyncio.Queue()
+        port = _free_port()
+        server = ShardedVdSServer(
+            "127.0.0.1", port, [{"identnr": "99", "keynr": 0}],
+            lambda event_type, data: events.put_nowait((event_type, data)), 0.5, workers=1,
+        )
+        await server.start()
+        try:
+            # The hub still believes the device is on worker 0, which has no connection for it:
+            # the worker hands the commands back and the hub queues them
+            server._owner["99"] = 0
+            assert server.send_output_commands("99", [(3, True, 1, 1)])
+            for _ in range(100):
+                if len(server.pending_outputs):
+                    break
+                await asyncio.sleep(0.05)
+            del server._owner["99"]
+            assert len(server.pending_outputs) == 1
+
+            tx = Transmitter()
+            await tx.connect(port)
+            await tx.recv()
+            await tx.send(tx.encode(4, ident_record("99")))
+            assert (await _event(events, "connected"))["identnr"] == "99"
+            frame = await _next_data_frame(tx)
+            assert (0x02, bytes([0x11, 3, 0x00, 0x02, 0x00])) in records(frame)
+            assert len(server.pending_outputs) == 0
+            await tx.send(tx.encode(3, rc=vds_lib.parse_header(frame).tc + 1))
+
+            # Live connection: the command goes straight to the worker holding it
+            assert server.send_output_commands("99", [(4, False, 1, 1)])
+            frame = await _next_data_frame(tx)
+            assert any(typ == 0x02 and content[1] == 4 for typ, content in records(frame))
+            tx.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_profile_covers_the_worker_processes(tmp_path):
+    async def run():
+        server = ShardedVdSServer(
+            "127.0.0.1", _free_port(), [{"identnr": "99", "keynr": 0}], lambda *args: None, 0.5, workers=1,
+        )
+        await server.start()
+        try:
+            hass = SimpleNamespace(config=SimpleNamespace(path=lambda name: str(tmp_path / name)))
+            result = await async_profile(hass, 1, [server])
+        finally:
+            await server.stop()
+        assert os.path.exists(result["file"])
+        [worker] = result["workers"]
+        assert worker["worker"] == 0 and worker["file"].endswith("_worker0.prof")
+        assert os.path.exists(worker["file"])
+
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+"""Minimal VdS 2465 transmitter for driving a VdSAsyncServer over TCP in tests."""
+import asyncio
+
+from custom_components.vds2465 import vds_lib
+
+
+def ident_record(identnr):
+    digits = [int(c) for c in identnr] + ([0xF] if len(identnr) % 2 else [])
+    packed = bytes(digits[i] | (digits[i + 1] << 4) for i in range(0, len(digits), 2))
+    return bytes([len(packed), 0x56]) + packed
+
+
+def server_port(server):
+    return server.servers[0].sockets[0].getsockname()[1]
+
+
+class Transmitter:
+    def __init__(self, keynr=0, key=None):
+        self.keynr = keynr
+        self.key = key
+        self.tc = 100
+        self.builder = vds_lib.FrameBuilder()
+        self.buffer = b""
+
+    async def connect(self, port):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+
+    def encode(self, ik, payload=b"", rc=0):
+        self.tc += 1
+        return bytes(self.builder.build(self.keynr, self.key, self.tc, rc, ik, payload))
+
+    async def send(self, raw):
+        self.writer.write(raw)
+        await self.writer.drain()
+
+    async def recv(self, timeout=5):
+        """Next decoded frame from the server."""
+        while True:
+            if len(self.buffer) >= vds_lib.LINK_HEADER.size:
+                keynr, length = vds_lib.LINK_HEADER.unpack_from(self.buffer)
+                end = vds_lib.LINK_HEADER.size + length
+                if len(self.buffer) >= end:
+                    data, ok = vds_lib.decode_frame(self.key if keynr else None, self.buffer[vds_lib.LINK_HEADER.size:end])
+                    self.buffer = self.buffer[end:]
+                    assert ok
+                    return data
+            chunk = await asyncio.wait_for(self.reader.read(4096), timeout)
+            if not chunk:
+                raise EOFError
+            self.buffer += chunk
+
+    async def closed(self, timeout=2):
+        try:
+            while True:
+                await self.recv(timeout)
+        except EOFError:
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def close(self):
+        self.writer.close()
+
+
+def records(frame):
+    """Payload records of a decoded frame as (type, content) tuples."""
+    header = vds_lib.parse_header(frame)
+    payload = frame[vds_lib.FRAME_HEAD.size:vds_lib.FRAME_HEAD.size + header.length]
+    result = []
+    offset = 0
+    while offset + 2 <= len(payload):
+        length, typ = payload[offset], payload[offset + 1]
+        result.append((typ, bytes(payload[offset + 2:offset + 2 + length])))
+        offset += 2 + length
+    return result